@@ -4,7 +4,6 @@ import sys
 import yaml
 from glob import glob
 from yaml import CLoader
-import codecs
 from wordnet import (Lexicon, Lemma, PartOfSpeech, LexicalEntry, Sense, 
                      SenseRelation, Definition, Example, Pronunciation, 
                      Synset, SynsetRelation, SynsetRelType, Form,
@@ -12,11 +11,19 @@ from wordnet import (Lexicon, Lemma, PartOfSpeech, LexicalEntry, Sense,
                      escape_lemma, inverse_sense_rels,
                      inverse_synset_rels)
 from wordnet_sql import SQLLexicon
+from wordnet_xml import write_lexicon
 from sense_keys import map_sense_key, unmap_sense_key
 import argparse
 import tempfile
 import sqlite3
-import gzip
+import gc
+import hashlib
+import os
+import pickle
+from functools import partial
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 
 def make_pos(y, pos):
     """
@@ -91,40 +98,65 @@ def synset_from_yaml(wn, props, id, lex_name, prefix):
     return ss
 
 
-def fix_sense_rels(wn, sense):
+def sense_relation_triples(senses):
     """
-    Add inverse sense relations as needed
+    Index the relations of the senses as a set of (source, rel_type, target)
+    triples
+    """
+    return set((sense.id, rel.rel_type, rel.target)
+               for sense in senses for rel in sense.sense_relations)
+
+
+def synset_relation_triples(synsets):
+    """
+    Index the relations of the synsets as a set of (source, rel_type, target)
+    triples
+    """
+    return set((synset.id, rel.rel_type, rel.target)
+               for synset in synsets for rel in synset.synset_relations)
+
+
+def fix_sense_rels(wn, sense, index, inferred=None):
+    """
+    Add inverse sense relations as needed. `index` holds the triples of the
+    existing sense relations (see `sense_relation_triples`) and is updated
+    with the added relations, which are also recorded in `inferred` if it is
+    given
     """
     for rel in sense.sense_relations:
-        target_id = rel.target
-        if (rel.rel_type in inverse_sense_rels
-                and inverse_sense_rels[rel.rel_type] != rel.rel_type):
-            sense2 = wn.sense_by_id(target_id)
-            if not any(sr for sr in sense2.sense_relations
-                    if sr.rel_type == inverse_sense_rels[rel.rel_type] and
-                        sr.target == sense.id):
-                sense2.add_sense_relation(
-                        SenseRelation(sense.id,
-                            inverse_sense_rels[rel.rel_type]))
+        inverse = inverse_sense_rels.get(rel.rel_type)
+        if inverse and inverse != rel.rel_type:
+            triple = (rel.target, inverse, sense.id)
+            if triple not in index:
+                sense2 = wn.sense_by_id(rel.target)
+                sense2.add_sense_relation(SenseRelation(sense.id, inverse))
+                index.add(triple)
+                if inferred is not None:
+                    inferred.add(triple)
 
 
-def fix_synset_rels(wn, synset):
+def fix_synset_rels(wn, synset, index, inferred=None):
     """
-    Add inverse synset relations as needed
+    Add inverse synset relations as needed. `index` holds the triples of the
+    existing synset relations (see `synset_relation_triples`) and is updated
+    with the added relations, which are also recorded in `inferred` if it is
+    given
     """
     for rel in synset.synset_relations:
-        if (rel.rel_type in inverse_synset_rels
-                and inverse_synset_rels[rel.rel_type] != rel.rel_type):
-            target_synset = wn.synset_by_id(rel.target)
-            if not target_synset:
-                print(synset.id)
-                print(rel.target)
-                continue
-            if not [sr for sr in target_synset.synset_relations if sr.target ==
-                    synset.id and sr.rel_type == inverse_synset_rels[rel.rel_type]]:
+        inverse = inverse_synset_rels.get(rel.rel_type)
+        if inverse and inverse != rel.rel_type:
+            triple = (rel.target, inverse, synset.id)
+            if triple not in index:
+                target_synset = wn.synset_by_id(rel.target)
+                if not target_synset:
+                    print(synset.id)
+                    print(rel.target)
+                    continue
                 target_synset.add_synset_relation(
-                    SynsetRelation(synset.id,
-                                   inverse_synset_rels[rel.rel_type]))
+                    SynsetRelation(synset.id, inverse))
+                index.add(triple)
+                if inferred is not None:
+                    inferred.add(triple)
 
 
 def read_yaml_file(file : str, bufsize: int = 0x100000):
@@ -167,17 +199,210 @@ def read_yaml_file(file : str, bufsize: int = 0x100000):
                     yield k, v
 
 
-def load(year="2022", plus=False,  db=None, cache_size=1000000, verbose=False, prefix="oewn", path=None):
+def entries_from_yaml(y, prefix):
+    """
+    Create the LexicalEntry objects for the content of an entries file
+    """
+    for lemma, pos_map in y.items():
+        for pos, props in pos_map.items():
+            entry = LexicalEntry(
+                "%s-%s-%s" % (prefix, escape_lemma(lemma), pos))
+            entry.set_lemma(Lemma(lemma, PartOfSpeech(pos[:1])))
+            if "form" in props:
+                for form in props["form"]:
+                    entry.add_form(Form(form))
+            for n, sense in enumerate(props["sense"]):
+                entry.add_sense(sense_from_yaml(sense, lemma, pos, n, prefix))
+            entry.pronunciation = pronunciation_from_yaml(props)
+            yield entry
+
+
+def parse_entries_file(file: str):
+    """
+    Parse an entries file into its map from lemma to part of speech to
+    entry properties
+    """
+    with open(file, encoding="utf-8") as inp:
+        return yaml.load(inp, Loader=CLoader)
+
+
+def parse_synsets_file(file: str):
+    """
+    Parse a lexicographer file into a list of synset IDs and properties
+    """
+    return list(read_yaml_file(file))
+
+
+# Increase when the pickled form of the lexicon changes to invalidate older
+# snapshots
+SNAPSHOT_FORMAT = 4
+
+
+def file_digest(file: str) -> str:
+    """
+    Compute the SHA-256 digest of the content of a source file
+    """
+    with open(file, "rb") as inp:
+        return hashlib.sha256(inp.read()).hexdigest()
+
+
+def write_pickle(file: str, *objs):
+    """
+    Pickle the objects one after another into a file. The file is written
+    under a temporary name first so that a concurrent reader never sees a
+    partial file
+    """
+    tmp_file = f"{file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as outp:
+        for obj in objs:
+            pickle.dump(obj, outp, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, file)
+
+
+def parse_cached(parser, cache_dir: str, file: str, digest: str):
+    """
+    Parse a file with `parser`, reusing the result stored in `cache_dir` if
+    the file had the same content digest when it was last parsed. There is
+    one stored result for each source file, replaced when its content
+    changes, so the cache does not grow as the files are edited
+    """
+    path = hashlib.sha256(os.path.abspath(file).encode("utf-8"))
+    cache_file = os.path.join(
+        cache_dir, f"{parser.__name__}-{path.hexdigest()[:16]}.pickle")
+    if os.path.exists(cache_file):
+        with open(cache_file, "rb") as inp:
+            if pickle.load(inp) == digest:
+                return pickle.load(inp)
+    data = parser(file)
+    write_pickle(cache_file, digest, data)
+    return data
+
+
+def parse_files(parser, files, executor=None, cache_dir=None, digests=None):
     """
-    Load wordnet from YAML files
+    Parse each of the files with `parser`, yielding the results in the same
+    order as `files`. If an executor is given the files are parsed by its
+    workers, otherwise they are parsed one at a time in this process. If a
+    cache directory is given, files that have not changed since they were
+    last parsed are read from the cache instead.
+    """
+    if cache_dir:
+        args = (files, [digests[f] for f in files])
+        parser = partial(parse_cached, parser, cache_dir)
+    else:
+        args = (files,)
+    if executor:
+        return executor.map(parser, *args)
+    else:
+        return map(parser, *args)
+
+
+def snapshot_file(cache_dir, year, plus, prefix, path):
+    """
+    The file holding the snapshot of the lexicon loaded with these options
+    """
+    options = hashlib.sha256(repr((year, plus, prefix, path)).encode("utf-8"))
+    return os.path.join(cache_dir, f"lexicon-{options.hexdigest()[:16]}.pickle")
+
+
+def record_source(wn, file, ids=None):
+    """
+    Record the modification time, size and digest of a source file in the
+    database of an SQLLexicon, with the IDs defined in it if given
+    """
+    stat = os.stat(file)
+    wn.set_source(os.path.normpath(file), stat.st_mtime_ns, stat.st_size,
+                  file_digest(file), ids)
+
+
+def load_frames(wn, path):
+    """Load the syntactic behaviours from `frames.yaml` in `path`"""
+    with open(f"{path}/frames.yaml", encoding="utf-8") as inp:
+        frames = yaml.load(inp, Loader=CLoader)
+        wn.frames = [SyntacticBehaviour(k,v) for k,v in frames.items()]
+
+
+def read_snapshot(file, key):
+    """
+    Read a lexicon snapshot, returning None if there is no snapshot or it was
+    built from different sources than those described by `key`
+    """
+    if not os.path.exists(file):
+        return None
+    with open(file, "rb") as inp:
+        if pickle.load(inp) != key:
+            return None
+        # The snapshot is a very large acyclic object graph, so the cyclic
+        # garbage collector would only slow down unpickling it
+        gc.disable()
+        try:
+            return pickle.load(inp)
+        finally:
+            gc.enable()
+
+
+def read_any_snapshot(file, options):
+    """
+    Read the lexicon snapshot loaded with `options` (year, plus, prefix,
+    path) whatever sources it was built from, returning the (file, digest)
+    pairs of those sources and the lexicon, or None if there is no snapshot
+    """
+    if not os.path.exists(file):
+        return None
+    with open(file, "rb") as inp:
+        key = pickle.load(inp)
+        if key[0] != SNAPSHOT_FORMAT or tuple(key[1:5]) != tuple(options):
+            return None
+        gc.disable()
+        try:
+            return key[5], pickle.load(inp)
+        finally:
+            gc.enable()
+
+
+def yaml_files(path):
+    """The entries files and the synsets files in `path`"""
+    entry_files = glob(f"{path}/**/entries-*.yaml", recursive=True)
+    synset_files = [f for f in glob(f"{path}/**/*.yaml", recursive=True)
+                    if "entries" not in f and "frames" not in f]
+    return entry_files, synset_files
+
+
+def file_lex_name(f):
+    """The lexicographer file name of the synsets file `f`"""
+    return os.path.splitext(os.path.basename(f))[0]
+
+
+def sql_lexicon(year, plus, prefix, db, cache_size=1000000, bulk_load=False):
+    """An SQLLexicon for the wordnet in the database `db`"""
+    return SQLLexicon(prefix, "Open English Wordnet", "en",
+                      "english-wordnet@googlegroups.com",
+                      "https://creativecommons.org/licenses/by/4.0",
+                      f"{year}+" if plus else year,
+                      "https://github.com/globalwordnet/english-wordnet",
+                      db=db, cache_size=cache_size, bulk_load=bulk_load)
+
+
+def load(year="2022", plus=False,  db=None, cache_size=1000000, verbose=False, prefix="oewn", path=None,
+         jobs=1, cache_dir=None):
+    """
+    Load wordnet from YAML files. If `jobs` is greater than one, the YAML
+    files are parsed in a pool of that many processes; the results are
+    merged in the same order as the serial load, so the resulting wordnet
+    is identical.
+
+    If `cache_dir` is given (and `db` is not), a snapshot of the loaded
+    wordnet is kept there, keyed by the digests of all the source files, and
+    returned directly when none of the sources has changed. Otherwise the
+    parsed content of each unchanged file is taken from the cache and only
+    the changed files are parsed again.
+
+    If `db` is given, it is filled in a single bulk load (see `SQLLexicon`)
+    and must be a new database. The source files are recorded in it, so
+    that it can be kept up to date by `load_database`.
     """
     if db:
-        wn = SQLLexicon(prefix, "Open English Wordnet", "en",
-                    "english-wordnet@googlegroups.com",
-                     "https://creativecommons.org/licenses/by/4.0",
-                     f"{year}+" if plus else year,
-                     "https://github.com/globalwordnet/english-wordnet",
-                     db=db, cache_size=cache_size)
+        wn = sql_lexicon(year, plus, prefix, db, cache_size, bulk_load=True)
     else:
         wn = Lexicon(prefix, "Open English Wordnet", "en",
                  "english-wordnet@googlegroups.com",
@@ -186,49 +411,74 @@ def load(year="2022", plus=False,  db=None, cache_size=1000000, verbose=False, p
                  "https://github.com/globalwordnet/english-wordnet")
     if path is None:
         path = "src/plus/" if plus else "src/yaml/"
-    with open(f"{path}/frames.yaml", encoding="utf-8") as inp:
-        frames = yaml.load(inp, Loader=CLoader)
-        wn.frames = [SyntacticBehaviour(k,v) for k,v in frames.items()]
-    for f in glob(f"{path}/**/entries-*.yaml", recursive=True):
-        if verbose:
-            print(f"Loading entries from {f}", file=sys.stderr)
-        with open(f, encoding="utf-8") as inp:
-            y = yaml.load(inp, Loader=CLoader)
-
-            for lemma, pos_map in y.items():
-                for pos, props in pos_map.items():
-                    entry = LexicalEntry(
-                        "%s-%s-%s" % (prefix, escape_lemma(lemma), pos))
-                    entry.set_lemma(Lemma(lemma, PartOfSpeech(pos[:1])))
-                    if "form" in props:
-                        for form in props["form"]:
-                            entry.add_form(Form(form))
-                    for n, sense in enumerate(props["sense"]):
-                        entry.add_sense(sense_from_yaml(sense, lemma, pos, n, prefix))
-                    entry.pronunciation = pronunciation_from_yaml(props)
-                    wn.add_entry(entry)
-
-    for f in glob(f"{path}/**/*.yaml", recursive=True):
-        if verbose:
-            print(f"Loading synsets from {f}", file=sys.stderr)
-        lex_name = f[9:-5]
-        if "entries" not in f and "frames" not in f:
-            for id, props in read_yaml_file(f):
-                wn.add_synset(synset_from_yaml(wn, props, id, lex_name, prefix))
-#            with open(f, encoding="utf-8") as inp:
-#                y = yaml.load(inp, Loader=CLoader)
-#
-#                if y is None:
-#                    continue
-#                for id, props in y.items():
-#                    wn.add_synset(synset_from_yaml(wn, props, id, lex_name, prefix))
+    entry_files, synset_files = yaml_files(path)
+
+    if db:
+        cache_dir = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        sources = [f"{path}/frames.yaml"] + entry_files + synset_files
+        digests = {f: file_digest(f) for f in sources}
+        snapshot = snapshot_file(cache_dir, year, plus, prefix, path)
+        snapshot_key = (SNAPSHOT_FORMAT, year, plus, prefix, path,
+                        [(f, digests[f]) for f in sources])
+        cached_wn = read_snapshot(snapshot, snapshot_key)
+        if cached_wn:
+            if verbose:
+                print(f"Loaded snapshot {snapshot}", file=sys.stderr)
+            return cached_wn
+    else:
+        digests = None
 
+    load_frames(wn, path)
+    if db:
+        record_source(wn, f"{path}/frames.yaml")
+
+    with ProcessPoolExecutor(jobs) if jobs > 1 else nullcontext() as executor:
+        # Both maps are submitted before any result is consumed so that the
+        # workers can parse the synset files while the entries are built
+        entry_data = parse_files(parse_entries_file, entry_files, executor,
+                                 cache_dir, digests)
+        synset_data = parse_files(parse_synsets_file, synset_files, executor,
+                                  cache_dir, digests)
+
+        for f, y in zip(entry_files, entry_data):
+            if verbose:
+                print(f"Loading entries from {f}", file=sys.stderr)
+            ids = []
+            for entry in entries_from_yaml(y, prefix):
+                wn.add_entry(entry)
+                ids.append(entry.id)
+            if db:
+                record_source(wn, f, ids)
+            else:
+                wn.sources[os.path.normpath(f)] = ids
+
+        for f, items in zip(synset_files, synset_data):
+            if verbose:
+                print(f"Loading synsets from {f}", file=sys.stderr)
+            lex_name = file_lex_name(f)
+            ids = []
+            for id, props in items:
+                synset = synset_from_yaml(wn, props, id, lex_name, prefix)
+                wn.add_synset(synset)
+                ids.append(synset.id)
+            if db:
+                record_source(wn, f, ids)
+            else:
+                wn.sources[os.path.normpath(f)] = ids
+
+    inferred = None if db else wn.inferred_relations
+
+    index = sense_relation_triples(
+        sense for entry in wn.entries() for sense in entry.senses)
     for entry in wn.entries():
         for sense in entry.senses:
-            fix_sense_rels(wn, sense)
+            fix_sense_rels(wn, sense, index, inferred)
 
+    index = synset_relation_triples(wn.synsets())
     for synset in wn.synsets():
-        fix_synset_rels(wn, synset)
+        fix_synset_rels(wn, synset, index, inferred)
 
     by_lex_name = {}
     for synset in wn.synsets():
@@ -239,6 +489,361 @@ def load(year="2022", plus=False,  db=None, cache_size=1000000, verbose=False, p
                 year, "https://github.com/globalwordnet/english-wordnet")
         by_lex_name[synset.lex_name].add_synset(synset)
 
+    if cache_dir:
+        write_pickle(snapshot, snapshot_key, wn)
+    if db:
+        wn.end_bulk_load()
+
+    return wn
+
+
+def remove_inferred_inverses(wn, source, relations, inverse_rels, get,
+                             relations_attr):
+    """
+    Remove the relations that were added to the targets of `relations` as
+    their inverse, as well as the record of the inferred relations of
+    `source` itself. Returns the IDs of the targets
+    """
+    targets = set()
+    for rel in relations:
+        targets.add(rel.target)
+        wn.inferred_relations.discard((source, rel.rel_type, rel.target))
+        inverse = (rel.target, inverse_rels.get(rel.rel_type), source)
+        if inverse in wn.inferred_relations:
+            wn.inferred_relations.remove(inverse)
+            target = get(rel.target)
+            if target:
+                setattr(target, relations_attr, [
+                    r for r in getattr(target, relations_attr)
+                    if r.target != source or r.rel_type != inverse[1]])
+    return targets
+
+
+def member_lemma(wn, member, pseudo_members):
+    """
+    The lemma of a member of a synset, which is the ID of its entry or None
+    for a member without an entry, whose lemma is the next of the iterator
+    `pseudo_members` (see `Lexicon.pseudo_members`). Returns None if the
+    lemma is not known
+    """
+    if member is None:
+        return next(pseudo_members, None)
+    entry = wn.entry_by_id(member)
+    return entry.lemma.written_form if entry else None
+
+
+def reload(wn, files, prefix="oewn"):
+    """
+    Reload the given YAML files into a wordnet returned by `load`. The
+    entries and synsets previously defined in these files are removed and
+    the files are read again. Only the relations, inverse relations and
+    member lists of the reloaded entries and synsets and of their direct
+    neighbours are updated, so the inferred inverse relations may be in a
+    different order than after a full load. A relation from an unchanged
+    file to an ID that did not exist before is only completed by a full
+    load.
+
+    Returns the sets of IDs of the synsets and senses that were reloaded or
+    whose relations may have changed.
+    """
+    files = [os.path.normpath(f) for f in files]
+    entry_files = [f for f in files
+                   if os.path.basename(f).startswith("entries-")]
+    synset_files = [f for f in files
+                    if f not in entry_files and
+                    os.path.basename(f) != "frames.yaml"]
+
+    stale_entries = [wn.entry_by_id(id) for f in entry_files
+                     for id in wn.sources.get(f, [])]
+    stale_synsets = [wn.synset_by_id(id) for f in synset_files
+                     for id in wn.sources.get(f, [])]
+    stale_synset_ids = set(ss.id for ss in stale_synsets)
+
+    new_entries = {f: list(entries_from_yaml(parse_entries_file(f), prefix))
+                   for f in entry_files}
+
+    # Synsets with a sense among the old or new entries, with their member
+    # lemmas. A member without an entry is None, and its lemma is taken from
+    # the record of those members; one whose lemma is not found is None and
+    # keeps its place as it is
+    member_lemmas = {}
+    for entry in chain(stale_entries,
+                       chain.from_iterable(new_entries.values())):
+        for sense in entry.senses:
+            synset = wn.synset_by_id(sense.synset)
+            if (synset and synset.id not in stale_synset_ids
+                    and synset.id not in member_lemmas):
+                pseudo_members = iter(wn.pseudo_members(synset.id))
+                member_lemmas[synset.id] = [
+                    member_lemma(wn, m, pseudo_members)
+                    for m in synset.members]
+
+    stale_sense_ids = set()
+    sense_neighbours = set()
+    for entry in stale_entries:
+        for sense in entry.senses:
+            stale_sense_ids.add(sense.id)
+            sense_neighbours.update(remove_inferred_inverses(
+                wn, sense.id, sense.sense_relations, inverse_sense_rels,
+                wn.sense_by_id, "sense_relations"))
+    wn.del_entries([entry.id for entry in stale_entries])
+    synset_neighbours = set()
+    for synset in stale_synsets:
+        synset_neighbours.update(remove_inferred_inverses(
+            wn, synset.id, synset.synset_relations, inverse_synset_rels,
+            wn.synset_by_id, "synset_relations"))
+    wn.del_synsets(stale_synset_ids)
+    for synset_id in stale_synset_ids | set(member_lemmas):
+        wn.del_pseudo_members(synset_id)
+
+    new_senses = []
+    for f, entries in new_entries.items():
+        ids = []
+        for entry in entries:
+            wn.add_entry(entry)
+            ids.append(entry.id)
+            new_senses.extend(entry.senses)
+        wn.sources[f] = ids
+    new_synsets = []
+    for f in synset_files:
+        lex_name = file_lex_name(f)
+        ids = []
+        for id, props in parse_synsets_file(f):
+            synset = synset_from_yaml(wn, props, id, lex_name, prefix)
+            wn.add_synset(synset)
+            ids.append(synset.id)
+            new_synsets.append(synset)
+        wn.sources[f] = ids
+
+    for synset_id, lemmas in member_lemmas.items():
+        synset = wn.synset_by_id(synset_id)
+        synset.members = [
+            m if lemma is None
+            else wn.entry_id_by_lemma_synset_id(lemma, synset.id, prefix)
+            for m, lemma in zip(synset.members, lemmas)]
+
+    # Only the relations of the fixed senses and synsets and of their targets
+    # are needed in the indexes
+    senses = new_senses + [wn.sense_by_id(id) for id in sense_neighbours
+                           if wn.sense_by_id(id)]
+    index = sense_relation_triples(senses)
+    index.update(sense_relation_triples(
+        wn.sense_by_id(rel.target) for sense in senses
+        for rel in sense.sense_relations if wn.sense_by_id(rel.target)))
+    for sense in senses:
+        fix_sense_rels(wn, sense, index, wn.inferred_relations)
+    synsets = new_synsets + [wn.synset_by_id(id) for id in synset_neighbours
+                             if wn.synset_by_id(id)]
+    index = synset_relation_triples(synsets)
+    index.update(synset_relation_triples(
+        wn.synset_by_id(rel.target) for synset in synsets
+        for rel in synset.synset_relations if wn.synset_by_id(rel.target)))
+    for synset in synsets:
+        fix_synset_rels(wn, synset, index, wn.inferred_relations)
+
+    return (set(ss.id for ss in synsets) | stale_synset_ids | set(member_lemmas),
+            set(s.id for s in senses) | sense_neighbours | stale_sense_ids)
+
+
+def load_changed(files, year="2022", plus=False, prefix="oewn", path=None,
+                 cache_dir=None, jobs=1, verbose=False):
+    """
+    Load wordnet to check a change to the given YAML files. The snapshot
+    in `cache_dir` is used even if it is out of date, by reloading the files
+    whose content differs from it. If there is no snapshot or files were
+    added or removed since, wordnet is loaded in full.
+
+    Returns the wordnet and the sets of IDs of the synsets and senses that
+    are defined in `files` or whose relations may have changed with them.
+    """
+    if path is None:
+        path = "src/plus/" if plus else "src/yaml/"
+    wn = None
+    stale = []
+    if cache_dir:
+        entry_files, synset_files = yaml_files(path)
+        sources = [f"{path}/frames.yaml"] + entry_files + synset_files
+        snapshot = read_any_snapshot(
+            snapshot_file(cache_dir, year, plus, prefix, path),
+            (year, plus, prefix, path))
+        if snapshot:
+            snapshot_digests = dict(snapshot[0])
+            if (set(snapshot_digests) == set(sources) and
+                    file_digest(sources[0]) == snapshot_digests[sources[0]]):
+                wn = snapshot[1]
+                stale = [f for f in sources[1:]
+                         if file_digest(f) != snapshot_digests[f]]
+    if wn is None:
+        wn = load(year=year, plus=plus, prefix=prefix, path=path, jobs=jobs,
+                  verbose=verbose, cache_dir=cache_dir)
+    if verbose and stale:
+        print(f"Reloading {len(stale)} changed files", file=sys.stderr)
+    synset_ids, sense_ids = reload(wn, stale, prefix) if stale else (set(), set())
+    for f in files:
+        for id in wn.sources.get(os.path.normpath(f), []):
+            if os.path.basename(f).startswith("entries-"):
+                entry = wn.entry_by_id(id)
+                sense_ids.update(sense.id for sense in entry.senses)
+            else:
+                synset_ids.add(id)
+    return wn, synset_ids, sense_ids
+
+
+# Increase when the schema of the compiled database changes to rebuild older
+# databases
+DATABASE_FORMAT = 1
+
+
+def stale_sources(wn, sources):
+    """
+    Compare the source files with those recorded in the database of an
+    SQLLexicon. A file with the same modification time and size is taken to
+    be unchanged; otherwise its digest is compared, and if only its time
+    changed the new time is recorded. Returns the lists of the files that
+    were added or changed and of those that were removed
+    """
+    recorded = wn.sources()
+    changed = []
+    for f in map(os.path.normpath, sources):
+        stat = os.stat(f)
+        if f in recorded:
+            mtime_ns, size, digest = recorded[f]
+            if (stat.st_mtime_ns, stat.st_size) == (mtime_ns, size):
+                continue
+            if stat.st_size == size and file_digest(f) == digest:
+                wn.set_source(f, stat.st_mtime_ns, size, digest)
+                continue
+        changed.append(f)
+    current = set(map(os.path.normpath, sources))
+    return changed, [f for f in recorded if f not in current]
+
+
+def update_database(wn, changed, removed, prefix="oewn", verbose=False):
+    """
+    Bring the database of an SQLLexicon built by `load` up to date with the
+    source files that were changed (or added) and removed. The entries and
+    synsets defined in these files are deleted and the changed files are
+    read again. The members of the other synsets with a sense among the old
+    or new entries are resolved again against the new entries.
+
+    As in any database built by `load`, the inverse relations are not
+    added.
+    """
+    entry_files = [f for f in changed + removed
+                   if os.path.basename(f).startswith("entries-")]
+    synset_files = set(f for f in changed + removed if f not in entry_files
+                       and os.path.basename(f) != "frames.yaml")
+
+    stale_entries = [id for f in entry_files for id in wn.source_ids(f)]
+    new_entries = {f: list(entries_from_yaml(parse_entries_file(f), prefix))
+                   for f in entry_files if f in changed}
+    member_synset_ids = set(
+        sense.synset
+        for entry in chain(wn.entries_by_ids(stale_entries),
+                           chain.from_iterable(new_entries.values()))
+        if entry for sense in entry.senses)
+
+    # The member lemmas of these synsets, which are those of the member
+    # entries or those that give the ID of a member without an entry. A
+    # synset with a member that is neither is read again from its file
+    member_synsets = [synset for synset in wn.synsets_by_ids(
+        sorted(member_synset_ids)) if synset]
+    member_ids = list(set(member for synset in member_synsets
+                          for member in synset.members))
+    members = dict(zip(member_ids, wn.entries_by_ids(member_ids)))
+    member_lemmas = {}
+    for synset in member_synsets:
+        pseudo_ids = {f"{prefix}-{escape_lemma(lemma)}-{synset.id[-1]}": lemma
+                      for lemma in wn.members_by_id(synset.id)}
+        lemmas = [members[member].lemma.written_form if members[member]
+                  else pseudo_ids.get(member) for member in synset.members]
+        if None in lemmas:
+            synset_files.update(wn.source_files([synset.id]))
+        else:
+            member_lemmas[synset.id] = lemmas
+    stale_synset_ids = [id for f in synset_files for id in wn.source_ids(f)]
+    reloaded = set(stale_synset_ids)
+    member_synsets = [synset for synset in member_synsets
+                      if synset.id in member_lemmas
+                      and synset.id not in reloaded]
+    if verbose:
+        print(f"Reloading {len(entry_files)} entries files and "
+              f"{len(synset_files)} synsets files, and the members of "
+              f"{len(member_synsets)} synsets", file=sys.stderr)
+
+    # A database left half updated is rebuilt rather than reused
+    wn.set_property("options", None)
+    wn.del_entries(stale_entries)
+    wn.del_synsets(stale_synset_ids +
+                   [synset.id for synset in member_synsets])
+    for f, entries in new_entries.items():
+        for entry in entries:
+            wn.add_entry(entry)
+        record_source(wn, f, [entry.id for entry in entries])
+    for f in sorted(synset_files):
+        if f in removed:
+            continue
+        lex_name = file_lex_name(f)
+        ids = []
+        for id, props in parse_synsets_file(f):
+            synset = synset_from_yaml(wn, props, id, lex_name, prefix)
+            wn.add_synset(synset)
+            ids.append(synset.id)
+        record_source(wn, f, ids)
+    for synset in member_synsets:
+        synset.members = [wn.entry_id_by_lemma_synset_id(lemma, synset.id, prefix)
+                          for lemma in member_lemmas[synset.id]]
+        wn.add_synset(synset)
+    for f in changed:
+        if os.path.basename(f) == "frames.yaml":
+            record_source(wn, f)
+    for f in removed:
+        wn.del_source(f)
+    wn.flush()
+
+
+def load_database(file, year="2024", plus=False, prefix="oewn", path=None,
+                  jobs=1, verbose=False, auto_reload=True, cache_size=1000000):
+    """
+    Open the wordnet compiled into the SQLite database `file`, building it
+    if it does not exist or was built with other options. Unless
+    `auto_reload` is false, the source files that changed since the
+    database was last brought up to date are first loaded again (see
+    `update_database`); otherwise the database is used as it is.
+    """
+    if path is None:
+        path = "src/plus/" if plus else "src/yaml/"
+    options = repr((DATABASE_FORMAT, year, plus, prefix,
+                    os.path.normpath(path)))
+    if os.path.exists(file):
+        conn = sqlite3.connect(file)
+        try:
+            wn = sql_lexicon(year, plus, prefix, conn, cache_size)
+            up_to_date = wn.get_property("options") == options
+        except sqlite3.DatabaseError:
+            # What is left of a bulk load that did not finish
+            up_to_date = False
+        if up_to_date:
+            load_frames(wn, path)
+            if auto_reload:
+                entry_files, synset_files = yaml_files(path)
+                changed, removed = stale_sources(
+                    wn, [f"{path}/frames.yaml"] + entry_files + synset_files)
+                if changed or removed:
+                    update_database(wn, changed, removed, prefix, verbose)
+                    wn.set_property("options", options)
+            elif verbose:
+                print(f"Using {file} without checking the sources",
+                      file=sys.stderr)
+            return wn
+        if verbose:
+            print(f"Rebuilding {file}", file=sys.stderr)
+        conn.close()
+        os.remove(file)
+    wn = load(year=year, plus=plus, db=sqlite3.connect(file),
+              cache_size=cache_size, verbose=verbose, prefix=prefix,
+              path=path, jobs=jobs)
+    wn.set_property("options", options)
     return wn
 
 
@@ -404,6 +1009,19 @@ def main():
         help="Use MySQL for storage (for large Wordnets)",
         default=False
         )
+    parse.add_argument(
+        "--database",
+        type=str,
+        help="SQLite database to use for storage, which is kept between runs"
+        " and only updated with the source files that changed (implies --sql)",
+        default=None
+        )
+    parse.add_argument(
+        "--disable-auto-reload",
+        action="store_true",
+        help="Use the existing --database even if source files changed",
+        default=False
+        )
     parse.add_argument(
         "--verbose",
         action="store_true",
@@ -428,6 +1046,18 @@ def main():
         help="Resource name for XML metadata (default oewn)",
         default="oewn"
         )
+    parse.add_argument(
+        "--jobs",
+        type=int,
+        help="Number of processes used to parse the YAML files and to write the XML (default 1)",
+        default=1
+        )
+    parse.add_argument(
+        "--cache",
+        type=str,
+        help="Directory in which to cache the loaded wordnet between runs",
+        default=None
+        )
     parse.add_argument(
         "--gzip",
         action="store_true",
@@ -436,21 +1066,23 @@ def main():
         )
     args = parse.parse_args()
     
-    if args.sql:
+    if args.database:
+        wn = load_database(args.database, year=args.year, plus=args.plus,
+                           prefix=args.prefix, path=args.folder,
+                           jobs=args.jobs, verbose=args.verbose,
+                           auto_reload=not args.disable_auto_reload,
+                           cache_size=args.cache_size)
+    elif args.sql:
         with tempfile.NamedTemporaryFile(delete=True) as tmp:
             with sqlite3.connect(tmp.name) as db:
                 wn = load(year=args.year, plus=args.plus, db=db, verbose=args.verbose,
                           cache_size=args.cache_size, prefix=args.prefix,
-                          path=args.folder)
+                          path=args.folder, jobs=args.jobs)
     else:
         wn = load(year=args.year, plus=args.plus, verbose=args.verbose, 
-                  prefix=args.prefix, path=args.folder)
-    if args.gzip:
-        with gzip.open(args.output, "wt", encoding="utf-8") as outp:
-            wn.to_xml(outp)
-    else:
-        with codecs.open(args.output, "w", "utf-8") as outp:
-            wn.to_xml(outp)
+                  prefix=args.prefix, path=args.folder, jobs=args.jobs,
+                  cache_dir=args.cache)
+    write_lexicon(wn, args.output, compress=args.gzip, jobs=args.jobs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+"""Reports the memory used by a loaded lexicon, in total as traced by
+`tracemalloc` and per class of the model.
+
+Usage:
+
+    python scripts/memory_report.py
+    python scripts/memory_report.py --plus
+    python scripts/memory_report.py --input wn.xml
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from collections import Counter
+from enum import Enum
+
+import wordnet
+from from_yaml import load
+from wordnet import parse_wordnet
+
+
+def model_sizes(root):
+    """
+    Count the objects reachable from `root` and their sizes in bytes by
+    class. Lists, dicts and other containers are counted with the model
+    object that holds them and every string is counted once, under "str"
+    """
+    counts = Counter()
+    sizes = Counter()
+    seen = set()
+    stack = [(root, type(root).__name__)]
+    while stack:
+        obj, owner = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, Enum)):
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, str):
+            owner = "str"
+            counts[owner] += 1
+        elif type(obj).__module__ == wordnet.__name__:
+            owner = type(obj).__name__
+            counts[owner] += 1
+        sizes[owner] += sys.getsizeof(obj)
+        for ref in gc.get_referents(obj):
+            stack.append((ref, owner))
+    return counts, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report the memory used by the lexicon")
+    parser.add_argument("--input", help="Load this WN-LMF file instead of"
+                        " the YAML sources")
+    parser.add_argument("--year", default="2024",
+                        help="The year of the release")
+    parser.add_argument("--plus", action="store_true",
+                        help="Load the Plus data too")
+    args = parser.parse_args()
+
+    gc.collect()
+    tracemalloc.start()
+    if args.input:
+        lexicon = parse_wordnet(args.input)
+    else:
+        lexicon = load(year=args.year, plus=args.plus)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    counts, sizes = model_sizes(lexicon)
+    print(f"{'Class':<20} {'Objects':>10} {'MB':>10}")
+    for name, size in sizes.most_common():
+        print(f"{name:<20} {counts[name]:>10} {size / 1e6:>10.1f}")
+    print(f"{'Total':<20} {sum(counts.values()):>10} "
+          f"{sum(sizes.values()) / 1e6:>10.1f}")
+    print()
+    print(f"Traced memory: {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -62,14 +62,17 @@ ss_types = {
 
 sense_id_lex_id = re.compile(".*%\\d:\\d\\d:(\\d\\d):.*")
 
-def gen_lex_id(e, s, prefix):
+# The lex_id in a mapped sense key, which can be read without unescaping
+# the lemma
+mapped_sense_id_lex_id = re.compile(".*__\\d\\.\\d\\d\\.(\\d\\d)\\.")
+
+def gen_lex_id(e, s, prefix, lex_ids=None):
     max_id = 0
     unseen = 1
     seen = False
     for s2 in e.senses:
         if s2.id:
-            m = re.match(sense_id_lex_id, unmap_sense_key(s2.id, prefix))
-            max_id = max(max_id, int(m.group(1)))
+            max_id = max(max_id, get_lex_id(s2.id, prefix, lex_ids))
         else:
             if not seen:
                 if s2.id == s.id:
@@ -80,7 +83,24 @@ def gen_lex_id(e, s, prefix):
 
 
 def extract_lex_id(sense_key):
-    return int(re.match(sense_id_lex_id, sense_key).group(1))
+    return int(sense_id_lex_id.match(sense_key).group(1))
+
+
+def get_lex_id(sense_id, prefix, lex_ids=None):
+    """
+    The lex_id of a sense ID. If `lex_ids` is given, it caches the lex_ids
+    by sense ID
+    """
+    if lex_ids is not None and sense_id in lex_ids:
+        return lex_ids[sense_id]
+    m = mapped_sense_id_lex_id.match(sense_id)
+    if m:
+        lex_id = int(m.group(1))
+    else:
+        lex_id = extract_lex_id(unmap_sense_key(sense_id, prefix))
+    if lex_ids is not None:
+        lex_ids[sense_id] = lex_id
+    return lex_id
 
 
 def sense_for_entry_synset_id(wn, ss_id, lemma):
@@ -90,7 +110,12 @@ def sense_for_entry_synset_id(wn, ss_id, lemma):
         if s.synset == ss_id][0]
 
 
-def get_head_word(wn, s, prefix):
+def get_head_word(wn, s, prefix, heads=None):
+    """
+    The lemma and lex_id of the head of the satellite synset of a sense. If
+    `heads` is given, it caches them by the ID of the head synset, which is
+    shared by all the satellites of a cluster
+    """
     ss = wn.synset_by_id(s.synset)
     # The hack here is we don't care about satellites in non-Princeton sets
     srs = [r for r in ss.synset_relations if r.rel_type ==
@@ -99,6 +124,8 @@ def get_head_word(wn, s, prefix):
         print([r.target for r in srs])
         print(s.id)
         print("Could not deduce target of satellite")
+    elif heads is not None and srs[0].target in heads:
+        return heads[srs[0].target]
     else:
         tss = wn.synset_by_id(srs[0].target)
         entry = wn.entry_by_id(tss.members[0])
@@ -108,7 +135,10 @@ def get_head_word(wn, s, prefix):
         entry_id = unmap_sense_key(s2.id, prefix)
         entry_id = entry_id[:entry_id.index("%")]
         if s2.id:
-            return entry_id, re.match(sense_id_lex_id, unmap_sense_key(s2.id, prefix)).group(1)
+            head = entry_id, sense_id_lex_id.match(unmap_sense_key(s2.id, prefix)).group(1)
+            if heads is not None:
+                heads[srs[0].target] = head
+            return head
         else:
             print(
                 "No sense key for target of satellite! Marking as 99... please fix for " +
@@ -118,98 +148,128 @@ def get_head_word(wn, s, prefix):
     exit(-1)
 
 
-def get_sense_key(wn, e, s, prefix):
-    """Calculate the sense key for a sense of an entry"""
-    ss = wn.synset_by_id(s.synset)
-    lemma = (e.lemma.written_form
+def sense_key_lemma(e):
+    """The lemma of an entry as written in its sense keys"""
+    return (e.lemma.written_form
         .replace(" ", "_")
         .replace("&apos", "'")
         .lower())
+
+
+def get_sense_key(wn, e, s, prefix, lex_ids=None, heads=None, lemma=None):
+    """
+    Calculate the sense key for a sense of an entry. `lex_ids` and `heads`
+    are the caches of `get_lex_id` and `get_head_word` and `lemma` is the
+    `sense_key_lemma` of the entry, if it is already known
+    """
+    ss = wn.synset_by_id(s.synset)
+    if lemma is None:
+        lemma = sense_key_lemma(e)
     ss_type = ss_types[ss.part_of_speech]
     lex_filenum = lex_filenums[ss.lex_name]
     if s.id:
-        lex_id = extract_lex_id(unmap_sense_key(s.id, prefix))
+        lex_id = get_lex_id(s.id, prefix, lex_ids)
     else:
-        lex_id = gen_lex_id(e, s, prefix)
+        lex_id = gen_lex_id(e, s, prefix, lex_ids)
     if ss.part_of_speech == PartOfSpeech.ADJECTIVE_SATELLITE:
-        head_word, head_id = get_head_word(wn, s, prefix)
+        head_word, head_id = get_head_word(wn, s, prefix, heads)
     else:
         head_word = ""
         head_id = ""
     return "%s%%%d:%02d:%02d:%s:%s" % (lemma, ss_type, lex_filenum,
                                        lex_id, head_word, head_id)
 
+
+class SenseKeyTable:
+    """
+    The sense keys of the senses of a lexicon by sense ID, each calculated
+    when it is first asked for, so that any message about a sense comes in
+    the order of the lookups. The caches of `get_lex_id` and
+    `get_head_word` are shared by all the senses
+    """
+
+    def __init__(self, wn, prefix):
+        self.wn = wn
+        self.prefix = prefix
+        self.lex_ids = {}
+        self.heads = {}
+        self.keys = {}
+
+    def sense_key(self, e, s, lemma=None):
+        """The sense key of the sense `s` of the entry `e`"""
+        key = self.keys.get(s.id)
+        if key is None:
+            key = get_sense_key(self.wn, e, s, self.prefix, self.lex_ids,
+                                self.heads, lemma)
+            self.keys[s.id] = key
+        return key
+
+# The escapes of the characters of a lemma that cannot be used in a sense ID
+SENSE_KEY_ESCAPES = {
+    "-": "--", "'": "-apos-", "!": "-excl-", "#": "-num-",
+    "$": "-dollar-", "%": "-percnt-", "&": "-amp-", "(": "-lpar-",
+    ")": "-rpar-", "*": "-ast-", "+": "-plus-", ",": "-comma-",
+    "/": "-sol-", "{": "-lbrace-", "|": "-vert-", "}": "-rbrace-",
+    "~": "-tilde-", "¢": "-cent-", "£": "-pound-", "§": "-sect-",
+    "©": "-copy-", "®": "-reg-", "°": "-deg-", "´": "-acute-",
+    "¶": "-para-", "º": "-ordm-", ":": "-colon-"}
+
+sense_key_escape_table = str.maketrans(SENSE_KEY_ESCAPES)
+
+# Most lemmas have no character to escape, which this finds faster than
+# translating them
+sense_key_unsafe = re.compile(
+    "[" + re.escape("".join(SENSE_KEY_ESCAPES)) + "]")
+
+sense_key_unescapes = {escape: c for c, escape in SENSE_KEY_ESCAPES.items()}
+
+# Every escape starts with a hyphen and all but "--" continue with a
+# letter, so at most one of them matches at any position
+sense_key_escape = re.compile(
+    "|".join(re.escape(escape) for escape in sense_key_unescapes))
+
+
 def escape_sense_key(s : str) -> str:
     """
     Escape a sense key for OEWN
     """
-    return (s.replace("-", "--")
-            .replace("'", "-apos-")
-            .replace("!", "-excl-").replace("#", "-num-")
-            .replace("$", "-dollar-").replace("%", "-percnt-")
-            .replace("&", "-amp-").replace("(", "-lpar-")
-            .replace(")", "-rpar-").replace("*", "-ast-")
-            .replace("+", "-plus-").replace(",", "-comma-")
-            .replace("/", "-sol-").replace("{", "-lbrace-")
-            .replace("|", "-vert-").replace("}", "-rbrace-")
-            .replace("~", "-tilde-").replace("¢", "-cent-")
-            .replace("£", "-pound-").replace("§", "-sect-")
-            .replace("©", "-copy-").replace("®", "-reg-")
-            .replace("°", "-deg-").replace("´", "-acute-")
-            .replace("¶", "-para-").replace("º", "-ordm-")
-            .replace(":", "-colon-"))
+    if sense_key_unsafe.search(s) is None:
+        return s
+    return s.translate(sense_key_escape_table)
+
+
+def _unescape(m):
+    return sense_key_unescapes[m.group()]
 
 
 def unescape_sense_key(s : str) -> str:
     """
     Unescape a sense key from OEWN
     """
-    return (s.replace("-apos-", "'")
-            .replace("-colon-", ":")
-            .replace("-excl-", "!").replace("-num-", "#")
-            .replace("-dollar-", "$").replace("-percnt-", "%")
-            .replace("-amp-", "&").replace("-lpar-", "(")
-            .replace("-rpar-", ")").replace("-ast-", "*")
-            .replace("-plus-", "+").replace("-comma-", ",")
-            .replace("-sol-", "/").replace("-lbrace-", "{")
-            .replace("-vert-", "|").replace("-rbrace-", "}")
-            .replace("-tilde-", "~").replace("-cent-", "¢")
-            .replace("-pound-", "£").replace("-sect-", "§")
-            .replace("-copy-", "©").replace("-reg-", "®")
-            .replace("-deg-", "°").replace("-acute-", "´")
-            .replace("-para-", "¶").replace("-ordm-", "º")
-            .replace("--", "-"))
+    if "-" not in s:
+        return s
+    return sense_key_escape.sub(_unescape, s)
+
 
 def map_sense_key(sk, prefix):
     """
     Maps a sense key into an XML-compatible sense key
     """
-    if "%" in sk:
-        e = sk.split("%")
-        if len(e) > 2:
-            lemma = "%".join(e[:-1])
-            info = e[-1]
-        else:
-            lemma = e[0]
-            info = e[1]
-        lemma = escape_sense_key(lemma)
-        return (prefix  + "-" + lemma +
-            "__" + info.replace("_","-sp-").replace(":","."))
+    lemma, percent, info = sk.rpartition("%")
+    if percent:
+        return (prefix + "-" + escape_sense_key(lemma) +
+                "__" + info.replace("_", "-sp-").replace(":", "."))
     else:
-        sk = escape_sense_key(sk)
-        return prefix + "-" + sk
+        return prefix + "-" + escape_sense_key(sk)
 
 def unmap_sense_key(sk, prefix):
     """
     Maps an XML-compatible sense key back to a normal sense key
     """
     KEY_PREFIX_LEN = len(prefix) + 1  # +1 for the hyphen
-    if "__" in sk:
-        e = sk.split("__")
-        oewn_key = e[0][KEY_PREFIX_LEN:]
-        r = "__".join(e[1:])
-        return (unescape_sense_key(oewn_key) + "%" +
+    oewn_key, sep, r = sk.partition("__")
+    if sep:
+        return (unescape_sense_key(oewn_key[KEY_PREFIX_LEN:]) + "%" +
                 r.replace("-sp-", "_").replace(".", ":"))
     else: 
         return unescape_sense_key(sk[KEY_PREFIX_LEN:])
-
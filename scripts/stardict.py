@@ -10,7 +10,9 @@ Usage:
     python scripts/stardict.py --input wn.xml --output english-wordnet-stardict
 """
 import argparse
+import os
 import sys
+import time
 
 from wordnet import PartOfSpeech, parse_wordnet
 
@@ -35,18 +37,22 @@ def format_definition(lexicon, entry):
     """Build the StarDict definition text for a single LexicalEntry."""
     pos_label = POS_LABELS.get(entry.lemma.part_of_speech, "")
     lines = [f"[{pos_label}]"] if pos_label else []
+    synsets = [synset for synset in lexicon.synsets_by_ids(
+        [sense.synset for sense in entry.senses])
+        if synset is not None and synset.definitions]
+    # The other members of all the synsets are looked up at once
+    member_ids = [member_id for synset in synsets
+                  for member_id in synset.members if member_id != entry.id]
+    members = dict(zip(member_ids, lexicon.entries_by_ids(member_ids)))
     n = 0
-    for sense in entry.senses:
-        synset = lexicon.synset_by_id(sense.synset)
-        if synset is None or not synset.definitions:
-            continue
+    for synset in synsets:
         n += 1
         gloss = "; ".join(d.text for d in synset.definitions)
         synonyms = []
         for member_id in synset.members:
             if member_id == entry.id:
                 continue
-            member = lexicon.entry_by_id(member_id)
+            member = members[member_id]
             if member is not None and member.lemma.written_form not in synonyms:
                 synonyms.append(member.lemma.written_form)
         line = f"{n}. {gloss}"
@@ -95,7 +101,12 @@ def main():
     args = parser.parse_args()
 
     print(f"Loading {args.input}...", file=sys.stderr)
+    start = time.perf_counter()
     lexicon = parse_wordnet(args.input)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(args.input) / 1e6
+    print(f"Parsed {size:.1f} MB in {elapsed:.1f}s "
+          f"({size / elapsed:.1f} MB/s)", file=sys.stderr)
 
     bookname = args.bookname or f"{lexicon.label} {lexicon.version}"
     convert(lexicon, args.output, bookname, dictzip=args.dictzip)
@@ -0,0 +1,111 @@
+"""Indexes of the values that should be unique across a lexicon.
+
+The definitions, ILIs and Wikidata IDs of the synsets and the sense keys
+are indexed in one pass over the lexicon, each value with the IDs of every
+synset (or, for sense keys, entry) that uses it, so that a duplicate is
+reported with all of its users at once.
+
+Usage:
+
+    python scripts/uniqueness.py --duplicates
+    python scripts/uniqueness.py --definition "a domesticated carnivore"
+    python scripts/uniqueness.py --ili i46360 --wikidata Q144
+    python scripts/uniqueness.py --sense-key "dog%1:05:00::"
+"""
+import argparse
+import re
+
+from from_yaml import load
+from sense_keys import map_sense_key
+
+valid_wikidata = re.compile("^Q[1-9][0-9]*$")
+
+
+def synset_wikidatas(synset):
+    """The Wikidata IDs of a synset, which may be given as one or a list"""
+    if not synset.wikidata:
+        return []
+    if isinstance(synset.wikidata, list):
+        return synset.wikidata
+    return [synset.wikidata]
+
+
+class UniquenessIndex:
+    """
+    Maps from each definition, ILI, Wikidata ID and sense ID to the list of
+    synsets (or entries, for sense IDs) that use it, in the order of the
+    lexicon. A synset that repeats a definition is listed once per use.
+    Placeholder ILIs ("in") and invalid Wikidata IDs are not indexed
+    """
+    # The indexes, and the names by which they are queried
+    NAMES = ("definitions", "ilis", "wikidatas", "sense_keys")
+
+    def __init__(self, lexicon):
+        self.definitions = {}
+        self.ilis = {}
+        self.wikidatas = {}
+        self.sense_keys = {}
+        for synset in lexicon.synsets():
+            for defn in synset.definitions:
+                self.definitions.setdefault(defn.text, []).append(synset.id)
+            if synset.ili != "in":
+                self.ilis.setdefault(synset.ili, []).append(synset.id)
+            for wikidata in synset_wikidatas(synset):
+                if valid_wikidata.match(wikidata):
+                    self.wikidatas.setdefault(wikidata, []).append(synset.id)
+        for entry in lexicon.entries():
+            for sense in entry.senses:
+                self.sense_keys.setdefault(sense.id, []).append(entry.id)
+
+    def duplicates(self, name):
+        """
+        The (value, ids) of the values of the index `name` that are used
+        more than once, in the order of their first use
+        """
+        return [(value, ids) for value, ids in getattr(self, name).items()
+                if len(ids) > 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the synsets and entries that share a value that"
+        " should be unique")
+    parser.add_argument("--definition", action="append", default=[],
+                        help="Find the synsets with this definition")
+    parser.add_argument("--ili", action="append", default=[],
+                        help="Find the synsets with this ILI")
+    parser.add_argument("--wikidata", action="append", default=[],
+                        help="Find the synsets with this Wikidata ID")
+    parser.add_argument("--sense-key", action="append", default=[],
+                        help="Find the entries with a sense with this key")
+    parser.add_argument("--duplicates", action="store_true",
+                        help="List every value that is used more than once")
+    parser.add_argument("--year", default="2024",
+                        help="Year of the Wordnet version (default 2024)")
+    parser.add_argument("--plus", action="store_true",
+                        help="Use the Wordnet+ source files")
+    parser.add_argument("--prefix", default="oewn",
+                        help="Prefix for the Wordnet version (default oewn)")
+    parser.add_argument("--cache", default=None,
+                        help="Directory in which to cache the loaded wordnet"
+                        " between runs")
+    args = parser.parse_args()
+
+    index = UniquenessIndex(load(year=args.year, plus=args.plus,
+                                 prefix=args.prefix, cache_dir=args.cache))
+    queries = (
+        [("definitions", value, value) for value in args.definition] +
+        [("ilis", value, value) for value in args.ili] +
+        [("wikidatas", value, value) for value in args.wikidata] +
+        [("sense_keys", value, map_sense_key(value, args.prefix))
+         for value in args.sense_key])
+    for name, value, key in queries:
+        print("%s\t%s" % (value, " ".join(getattr(index, name).get(key, []))))
+    if args.duplicates:
+        for name in UniquenessIndex.NAMES:
+            for value, ids in index.duplicates(name):
+                print("%s\t%s\t%s" % (name, value, " ".join(ids)))
+
+
+if __name__ == "__main__":
+    main()
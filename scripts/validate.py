@@ -1,13 +1,23 @@
 from wordnet import (parse_wordnet, SynsetRelType, PartOfSpeech, SenseRelType,
                      Synset, inverse_synset_rels, inverse_sense_rels, equal_pos)
+import gc
+import io
+import multiprocessing
 import re
+import subprocess
 import sys
+import time
+import traceback
 import glob
 import sense_keys
 from sense_keys import unmap_sense_key
 from wordnet import xml_id_char
 from collections import Counter
-from from_yaml import load
+from contextlib import redirect_stderr, redirect_stdout
+from from_yaml import (load, load_changed, sense_relation_triples,
+                       synset_relation_triples)
+from wordnet_graph import RelationGraph, find_cycles, topological_order
+from uniqueness import UniquenessIndex, synset_wikidatas, valid_wikidata
 import argparse
 
 # This is temporary list of exceptions for linking where a taxon name is 
@@ -17,56 +27,82 @@ import argparse
 WIKIDATA_DUPLICATION_EXCEPTIONS = [
 "Q134842", "Q138789", "Q161142", "Q644312", "Q1423091", "Q5309794", "Q1024025", "Q133876", "Q1783190", "Q1974044", "Q2704518", "Q2708653", "Q1362995", "Q858999", "Q26949", "Q2511051", "Q5230439", "Q4006525", "Q150242", "Q94815", "Q2719974", "Q908118", "Q2589976", "Q355080", "Q138842", "Q5222959", "Q157905", "Q2975317", "Q2496817", "Q2574724", "Q2707277", "Q161075", "Q2720105", "Q157748", "Q156851", "Q156699", "Q159077", "Q133285", "Q1754165", "Q205265", "Q133827", "Q1425929", "Q158975", "Q1969330", "Q310801", "Q648056", "Q1514169", "Q2452570", "Q1354632", "Q3338824", "Q2213704", "Q135537", "Q7840756", "Q134827", "Q199695", "Q1061596", "Q139000", "Q199456", "Q180597", "Q133017", "Q795375", "Q130948", "Q1708883", "Q2304642", "Q4795779", "Q74083", "Q990101", "Q41317", "Q1137414", "Q2136293", "Q905053", "Q300923", "Q2500468", "Q734870", "Q1518954", "Q40621", "Q132672", "Q309466", "Q1060870", "Q130902", "Q14400", "Q130988", "Q319520", "Q131688", "Q179204", "Q595983", "Q19119", "Q1329239", "Q213536", "Q752529", "Q734720", "Q788536", "Q621861", "Q46316", "Q25336", "Q3388845", "Q344662", "Q2706095", "Q185231", "Q190701", "Q756089", "Q899799", "Q369761", "Q811633", "Q185167", "Q310869", "Q132950", "Q1307559", "Q133259", "Q2166073", "Q329334", "Q1136219" ]
 
+def relation_targets(sources, relations_attr, get_many):
+    """The existing targets of the relations of `sources` that are not
+    among them, looked up together by `get_many`"""
+    ids = set(source.id for source in sources)
+    targets = set(rel.target for source in sources
+                  for rel in getattr(source, relations_attr)) - ids
+    return [target for target in get_many(sorted(targets)) if target]
+
+
 def check_symmetry(wn, fix):
     errors = []
-    for synset in wn.synsets():
+    # Read the synsets and senses once, which for the SQL backend means a
+    # single scan rather than a query for every relation, and index all
+    # relations so that each inverse is one set lookup
+    synsets = list(wn.synsets())
+    senses = [sense for entry in wn.entries() for sense in entry.senses]
+    # When only part of the lexicon is checked, the targets outside of it
+    # are looked up to index their relations too
+    synset_targets = synsets + relation_targets(
+        synsets, "synset_relations", wn.synsets_by_ids)
+    sense_targets = senses + relation_targets(
+        senses, "sense_relations", wn.senses_by_ids)
+    synset_ids = set(synset.id for synset in synset_targets)
+    sense_ids = set(sense.id for sense in sense_targets)
+    synset_index = synset_relation_triples(synset_targets)
+    sense_index = sense_relation_triples(sense_targets)
+    for synset in synsets:
         for rel in synset.synset_relations:
             if rel.rel_type in inverse_synset_rels:
-                synset2 = wn.synset_by_id(rel.target)
-                if not synset2:
+                if rel.target not in synset_ids:
                     # This error only happens if the XML validation is not
                     # being carried out!
                     print(
                         "Referencing bad synset ID %s from %s" %
                         (rel.target, synset.id))
                 else:
-                    if not any(r for r in synset2.synset_relations if r.target ==
-                               synset.id and r.rel_type == inverse_synset_rels[rel.rel_type]):
+                    inverse = inverse_synset_rels[rel.rel_type]
+                    if (rel.target, inverse, synset.id) not in synset_index:
                         if fix:
                             errors.append("python3 scripts/change-relation.py --add --new-relation %s %s %s" % (
-                                inverse_synset_rels[rel.rel_type].value, synset2.id, synset.id))
+                                inverse.value, rel.target, synset.id))
                         else:
                             errors.append(
                                 "No symmetric relation for %s =%s=> %s" %
-                                (synset.id, rel.rel_type, synset2.id))
-    for entry in wn.entries():
-        for sense in entry.senses:
-            for rel in sense.sense_relations:
-                if rel.rel_type in inverse_sense_rels:
-                    sense2 = wn.sense_by_id(rel.target)
-                    if not sense2:
+                                (synset.id, rel.rel_type, rel.target))
+    for sense in senses:
+        for rel in sense.sense_relations:
+            if rel.rel_type in inverse_sense_rels:
+                if rel.target not in sense_ids:
+                    errors.append(
+                            "Reference to no existant sense %s)" % (rel.target))
+                    continue
+                inverse = inverse_sense_rels[rel.rel_type]
+                if (rel.target, inverse, sense.id) not in sense_index:
+                    if fix:
+                        errors.append("python3 scripts/change-relation.py --add --new-relation %s %s %s" % (
+                            inverse.value, rel.target, sense.id))
+                    else:
                         errors.append(
-                                "Reference to no existant sense %s)" % (rel.target))
-                        continue
-                    if not any(r for r in sense2.sense_relations if r.target ==
-                               sense.id and r.rel_type == inverse_sense_rels[rel.rel_type]):
-                        if fix:
-                            errors.append("python3 scripts/change-relation.py --add --new-relation %s %s %s" % (
-                                inverse_sense_rels[rel.rel_type].value, sense2.id, sense.id))
-                        else:
-                            errors.append(
-                                "No symmetric relation for %s =%s=> %s" %
-                                (sense.id, rel.rel_type, sense2.id))
+                            "No symmetric relation for %s =%s=> %s" %
+                            (sense.id, rel.rel_type, rel.target))
 
     return errors
 
 
 def check_transitive(wn, fix):
     errors = []
-    for synset in wn.synsets():
+    synsets = list(wn.synsets())
+    hypernym_ids = list(set(rel.target for synset in synsets
+                            for rel in synset.synset_relations
+                            if rel.rel_type == SynsetRelType.HYPERNYM))
+    hypernyms = dict(zip(hypernym_ids, wn.synsets_by_ids(hypernym_ids)))
+    for synset in synsets:
         for rel in synset.synset_relations:
             if rel.rel_type == SynsetRelType.HYPERNYM:
-                synset2 = wn.synset_by_id(rel.target)
+                synset2 = hypernyms[rel.target]
                 for rel2 in synset2.synset_relations:
                     if (any(r for r in synset.synset_relations if r.target ==
                            rel2.target and r.rel_type == SynsetRelType.HYPERNYM) and
@@ -81,49 +117,22 @@ def check_transitive(wn, fix):
                                 (synset.id, synset2.id, rel2.target))
     return errors
 
-def check_no_loops(wn):
-    hypernyms = {}
-    for synset in wn.synsets():
-        hypernyms[synset.id] = set()
-        for rel in synset.synset_relations:
-            if rel.rel_type == SynsetRelType.HYPERNYM:
-                hypernyms[synset.id].add(rel.target)
-    changed = True
-    while changed:
-        changed = False
-        for synset in wn.synsets():
-            n_size = len(hypernyms[synset.id])
-            for c in hypernyms[synset.id]:
-                hypernyms[synset.id] = hypernyms[synset.id].union(
-                    hypernyms.get(c, []))
-                if synset.id in hypernyms[synset.id]:
-                    return ["Loop for %s <-> %s" % (synset.id, c)]
-            if len(hypernyms[synset.id]) != n_size:
-                changed = True
-    return []
-
-def check_no_domain_loops(wn):
-    domains = {}
-    for synset in wn.synsets():
-        domains[synset.id] = set()
-        for rel in synset.synset_relations:
-            if (rel.rel_type == SynsetRelType.DOMAIN_TOPIC or
-                rel.rel_type == SynsetRelType.DOMAIN_REGION or
-                rel.rel_type == SynsetRelType.EXEMPLIFIES):
-                domains[synset.id].add(rel.target)
-    changed = True
-    while changed:
-        changed = False
-        for synset in wn.synsets():
-            n_size = len(domains[synset.id])
-            for c in domains[synset.id]:
-                domains[synset.id] = domains[synset.id].union(
-                    domains.get(c, []))
-            if len(domains[synset.id]) != n_size:
-                changed = True
-            if synset.id in domains[synset.id]:
-                return ["Domain loop for %s" % (synset.id)]
-    return []
+def check_no_loops(wn, graph=None):
+    graph = graph or RelationGraph(wn)
+    _, loops = topological_order(
+        graph.synset_relations[SynsetRelType.HYPERNYM])
+    return ["Loop for %s" % " => ".join(graph.synset_ids[i]
+                                         for i in loop + loop[:1])
+            for loop in loops]
+
+def check_no_domain_loops(wn, graph=None):
+    graph = graph or RelationGraph(wn)
+    domains = graph.synset_relations[SynsetRelType.DOMAIN_TOPIC].union(
+        graph.synset_relations[SynsetRelType.DOMAIN_REGION],
+        graph.synset_relations[SynsetRelType.EXEMPLIFIES])
+    return ["Domain loop for %s" % " => ".join(graph.synset_ids[i]
+                                                for i in loop + loop[:1])
+            for loop in find_cycles(domains)]
 
 def check_not_empty(wn, ss):
     if not wn.members_by_id(ss.id):
@@ -143,7 +152,7 @@ def check_ili(ss, fix):
     return errors
 
 
-def check_lex_files(wn, fix, prefix):
+def check_lex_files(wn, fix, prefix, calc_sense_keys=None):
     pos_map = {
         "nou": PartOfSpeech.NOUN,
         "ver": PartOfSpeech.VERB,
@@ -151,7 +160,10 @@ def check_lex_files(wn, fix, prefix):
         "adv": PartOfSpeech.ADVERB
     }
     errors = 0
+    if calc_sense_keys is None:
+        calc_sense_keys = sense_keys.SenseKeyTable(wn, prefix)
     for entry in wn.entries():
+        lemma = sense_keys.sense_key_lemma(entry)
         for sense in entry.senses:
             if not sense.id:
                 print("%s does not have a sense key" % (sense.id))
@@ -161,8 +173,7 @@ def check_lex_files(wn, fix, prefix):
                       (sense.id, sense.synset))
                 errors += 1
                 continue
-            calc_sense_key = sense_keys.get_sense_key(
-                wn, entry, sense, prefix)
+            calc_sense_key = calc_sense_keys.sense_key(entry, sense, lemma)
             sense_key = unmap_sense_key(sense.id, prefix)
             if sense_key != calc_sense_key:
                 if fix:
@@ -185,7 +196,6 @@ valid_sense_id = re.compile(
 
 valid_synset_id = re.compile("^oewn-[0-9]{8}-[nvars]$")
 
-valid_wikidata = re.compile("^Q[1-9][0-9]*$")
 
 
 def is_valid_id(xml_id):
@@ -209,46 +219,13 @@ def is_valid_sense_id(xml_id, synset):
         return True
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Validate the OEWN data files")
-    parser.add_argument(
-        "--year",
-        type=str,
-        help="Year of the Wordnet version (default 2024)",
-        default="2024"
-    )
-    parser.add_argument(
-        "--plus",
-        action="store_true",
-        help="Use the Wordnet+ source files",
-        default=False
-    )
-    parser.add_argument(
-        "--fix",
-        action="store_true",
-        help="Output commands to fix issues where possible",
-        default=False
-    )
-    parser.add_argument(
-        "--prefix",
-        type=str,
-        help="Prefix for the Wordnet version (default oewn)",
-        default="oewn"
-    )
-    args = parser.parse_args()
-
-    #wn = parse_wordnet("wn.xml")
-    wn = load(year=args.year, plus=args.plus)
+def validate_lex_files(wn, fix, prefix, graph):
+    return check_lex_files(wn, fix, prefix)
 
-    fix = args.fix
 
+def validate_entries(wn, fix, prefix, graph):
     errors = 0
 
-    errors += check_lex_files(wn, fix, args.prefix)
-
-    sense_keys = {}
-
     for entry in wn.entries():
         if (entry.id[-1:] != entry.lemma.part_of_speech.value and not entry.id[-1].isnumeric()
             or entry.id[-1].isnumeric() and entry.id[-3:-2] != entry.lemma.part_of_speech.value):
@@ -300,11 +277,6 @@ def main():
                 # if sr.target == sense.id:
                 #    print("ERROR: Reflexive sense relation %s" % (sense.id))
                 #    errors += 1
-            if unmap_sense_key(sense.id, args.prefix) in sense_keys:
-                print("ERROR: Duplicate sense key %s" % sense.id)
-                errors += 1
-            else:
-                sense_keys[sense.id] = sense.synset
             sb_counter = Counter(sense.subcat)
             for item, count in sb_counter.items():
                 if count > 1:
@@ -318,10 +290,13 @@ def main():
                         sense.id, sense2.id, sense.synset))
                     errors += 1
 
+    return errors
+
+
+def validate_synsets(wn, fix, prefix, graph):
+    errors = 0
+
     instances = set()
-    ilis = set()
-    wikidatas = set()
-    definitions = set()
 
     for synset in wn.synsets():
         if synset.id[-1:] != synset.part_of_speech.value:
@@ -423,11 +398,6 @@ def main():
             if len(defn.text) == 0:
                 print("ERROR: empty definition for %s" % (synset.id))
                 errors += 1
-            if defn.text in definitions:
-                print("ERROR: duplicate definition for %s (%s)" % (synset.id, defn.text))
-                errors += 1
-            else:
-                definitions.add(defn.text)
 
         sr_counter = Counter((sr.target, sr.rel_type)
                              for sr in synset.synset_relations)
@@ -438,23 +408,10 @@ def main():
                     (synset.id, item[1], item[0]))
                 errors += 1
 
-        if synset.ili != "in" and synset.ili in ilis:
-            print(f"ERROR: ILI {synset.ili} is duplicated")
-            errors += 1
-        else:
-            ilis.add(synset.ili)
-
-        if synset.wikidata:
-            ss_wikidatas = synset.wikidata if isinstance(synset.wikidata, list) else [synset.wikidata]
-            for wikidata in ss_wikidatas:
-                if not valid_wikidata.match(wikidata):
-                    print(f"ERROR: Invalid Wikidata ID {wikidata} for {synset.id}")
-                    errors += 1
-                elif wikidata in wikidatas and wikidata not in WIKIDATA_DUPLICATION_EXCEPTIONS:
-                    print(f"ERROR: QID {wikidata} is duplicated")
-                    errors += 1
-                else:
-                    wikidatas.add(wikidata)
+        for wikidata in synset_wikidatas(synset):
+            if not valid_wikidata.match(wikidata):
+                print(f"ERROR: Invalid Wikidata ID {wikidata} for {synset.id}")
+                errors += 1
 
     for synset in wn.synsets():
         for sr in synset.synset_relations:
@@ -465,38 +422,289 @@ def main():
                         (synset.id, sr.target))
                     errors += 1
 
-    for error in check_symmetry(wn, fix):
-        if fix:
-            print(error)
-        else:
-            print("ERROR: " + error)
-            errors += 1
+    return errors
+
 
-    for error in check_transitive(wn, fix):
+def print_errors(errors, fix):
+    """Print the errors of a check, or the commands that fix them"""
+    for error in errors:
         if fix:
             print(error)
         else:
             print("ERROR: " + error)
-            errors += 1
+    return 0 if fix else len(errors)
 
-    for error in check_no_loops(wn):
-        if fix:
-            sys.stderr.write("Cannot be fixed")
-            sys.exit(-1)
-        else:
-            print("ERROR: " + error)
-            errors += 1
 
-    for error in check_no_domain_loops(wn):
-        if fix:
-            sys.stderr.write("Cannot be fixed")
-            sys.exit(-1)
-        else:
-            print("ERROR: " + error)
-            errors += 1
+def print_unfixable_errors(errors, fix):
+    """Print the errors of a check that cannot be fixed automatically"""
+    if errors and fix:
+        sys.stderr.write("Cannot be fixed")
+        sys.exit(-1)
+    return print_errors(errors, fix)
+
+
+def validate_symmetry(wn, fix, prefix, graph):
+    return print_errors(check_symmetry(wn, fix), fix)
+
+
+def validate_transitive(wn, fix, prefix, graph):
+    return print_errors(check_transitive(wn, fix), fix)
+
+
+def validate_loops(wn, fix, prefix, graph):
+    return print_unfixable_errors(check_no_loops(wn, graph), fix)
+
+
+def validate_domain_loops(wn, fix, prefix, graph):
+    return print_unfixable_errors(check_no_domain_loops(wn, graph), fix)
+
+
+class Neighbourhood:
+    """
+    The part of a lexicon that a change can affect: the changed synsets and
+    senses and those they are related to. Iterating the entries and synsets
+    gives only those in the neighbourhood, in the order of the lexicon,
+    while lookups by ID go to the whole lexicon
+    """
+
+    def __init__(self, lexicon, synset_ids, sense_ids):
+        self.lexicon = lexicon
+        synset_ids = set(synset_ids)
+        sense_ids = set(sense_ids)
+        synsets = [synset for synset in lexicon.synsets_by_ids(list(synset_ids))
+                   if synset]
+        member_ids = list(set(member for synset in synsets
+                              for member in synset.members))
+        members = dict(zip(member_ids, lexicon.entries_by_ids(member_ids)))
+        for synset in synsets:
+            synset_ids.update(rel.target for rel in synset.synset_relations)
+            for member in synset.members:
+                entry = members[member]
+                if entry:
+                    sense_ids.update(sense.id for sense in entry.senses
+                                     if sense.synset == synset.id)
+        for sense in lexicon.senses_by_ids(list(sense_ids)):
+            if sense:
+                sense_ids.update(rel.target for rel in sense.sense_relations)
+                synset_ids.add(sense.synset)
+        self._entries = [entry for entry in lexicon.entries()
+                         if any(sense.id in sense_ids for sense in entry.senses)]
+        self._synsets = [synset for synset in lexicon.synsets()
+                         if synset.id in synset_ids]
+
+    def __getattr__(self, name):
+        return getattr(self.lexicon, name)
+
+    def entries(self):
+        return self._entries
+
+    def synsets(self):
+        return self._synsets
+
+
+def validate_uniqueness(wn, fix, prefix, graph):
+    """
+    Report each definition, ILI, Wikidata ID and sense key used more than
+    once, with all of its users. For a Neighbourhood, the values are
+    indexed over the whole lexicon and only the duplicates used in the
+    neighbourhood are reported
+    """
+    errors = 0
+    if isinstance(wn, Neighbourhood):
+        index = UniquenessIndex(wn.lexicon)
+        synset_ids = set(synset.id for synset in wn.synsets())
+        entry_ids = set(entry.id for entry in wn.entries())
+    else:
+        index = UniquenessIndex(wn)
+        synset_ids = entry_ids = None
+
+    def duplicates(name, ids_in_view):
+        return [(value, ids) for value, ids in index.duplicates(name)
+                if ids_in_view is None or not ids_in_view.isdisjoint(ids)]
+
+    for text, ids in duplicates("definitions", synset_ids):
+        print("ERROR: duplicate definition for %s (%s)" % (", ".join(ids), text))
+        errors += len(ids) - 1
+    for ili, ids in duplicates("ilis", synset_ids):
+        print(f"ERROR: ILI {ili} is duplicated in {', '.join(ids)}")
+        errors += len(ids) - 1
+    for wikidata, ids in duplicates("wikidatas", synset_ids):
+        if wikidata not in WIKIDATA_DUPLICATION_EXCEPTIONS:
+            print(f"ERROR: QID {wikidata} is duplicated in {', '.join(ids)}")
+            errors += len(ids) - 1
+    for sense_id, ids in duplicates("sense_keys", entry_ids):
+        print("ERROR: Duplicate sense key %s in %s" % (sense_id, ", ".join(ids)))
+        errors += len(ids) - 1
+    return errors
+
+
+# The independent units of the validation, in the order of their output.
+# Each prints its errors and returns the number of them
+CHECKS = [
+    ("lex files", validate_lex_files),
+    ("entries", validate_entries),
+    ("synsets", validate_synsets),
+    ("uniqueness", validate_uniqueness),
+    ("symmetry", validate_symmetry),
+    ("transitive", validate_transitive),
+    ("loops", validate_loops),
+    ("domain loops", validate_domain_loops),
+]
+
+
+# The checks being run and their (wn, fix, prefix, graph) arguments. Worker
+# processes are forked from the validating process, so they share the
+# loaded lexicon rather than having it pickled
+_validation = None
+
+
+def run_check(index):
+    """
+    Run one of the checks, capturing what it prints. Returns the standard
+    output, the standard error, the number of errors, the wall time and
+    the exit status if the check exited (or None). A check that raises an
+    exception exits with status 1, with the traceback on its standard error
+    """
+    checks, args = _validation
+    name, check = checks[index]
+    stdout, stderr = io.StringIO(), io.StringIO()
+    errors = 0
+    status = None
+    start = time.perf_counter()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            errors = check(*args)
+        except SystemExit as e:
+            status = e.code
+        except Exception:
+            stderr.write("The %s check failed\n" % name)
+            stderr.write(traceback.format_exc())
+            status = 1
+    return (stdout.getvalue(), stderr.getvalue(), errors,
+            time.perf_counter() - start, status)
+
+
+def run_checks(wn, fix, prefix, jobs=1, checks=CHECKS, graph=None):
+    """
+    Run the checks, in a pool of `jobs` processes if that is more than one,
+    and return their results in order
+    """
+    global _validation
+    _validation = (checks, (wn, fix, prefix, graph or RelationGraph(wn)))
+    try:
+        if jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+            with context.Pool(min(jobs, len(checks))) as pool:
+                return pool.map(run_check, range(len(checks)), chunksize=1)
+        results = []
+        for index in range(len(checks)):
+            results.append(run_check(index))
+            if results[-1][4] is not None:
+                break
+        return results
+    finally:
+        _validation = None
+
+
+def changed_files(diff_range):
+    """The YAML files changed in a git diff range"""
+    diff = subprocess.run(["git", "diff", "--name-only", diff_range],
+                          capture_output=True, text=True, check=True)
+    return [f for f in diff.stdout.splitlines() if f.endswith(".yaml")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Validate the OEWN data files")
+    parser.add_argument(
+        "--year",
+        type=str,
+        help="Year of the Wordnet version (default 2024)",
+        default="2024"
+    )
+    parser.add_argument(
+        "--plus",
+        action="store_true",
+        help="Use the Wordnet+ source files",
+        default=False
+    )
+    parser.add_argument(
+        "--fix",
+        action="store_true",
+        help="Output commands to fix issues where possible",
+        default=False
+    )
+    parser.add_argument(
+        "--prefix",
+        type=str,
+        help="Prefix for the Wordnet version (default oewn)",
+        default="oewn"
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        help="Directory in which to cache the loaded wordnet between runs",
+        default=None
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Number of processes used to run the checks (default 1)",
+        default=1
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the time taken and the errors found by each check",
+        default=False
+    )
+    parser.add_argument(
+        "--changed",
+        nargs="+",
+        help="Only validate what could be affected by changes to these YAML files",
+        default=None
+    )
+    parser.add_argument(
+        "--diff",
+        type=str,
+        help="Only validate what could be affected by the YAML files changed in this git diff range (e.g., main...HEAD)",
+        default=None
+    )
+    args = parser.parse_args()
 
- 
-    if fix:
+    #wn = parse_wordnet("wn.xml")
+    if args.changed or args.diff:
+        files = list(args.changed or [])
+        if args.diff:
+            files += changed_files(args.diff)
+        wn, synset_ids, sense_ids = load_changed(
+            files, year=args.year, plus=args.plus, prefix=args.prefix,
+            cache_dir=args.cache, jobs=args.jobs)
+        graph = RelationGraph(wn)
+        wn = Neighbourhood(wn, synset_ids, sense_ids)
+    else:
+        wn = load(year=args.year, plus=args.plus, cache_dir=args.cache,
+                  jobs=args.jobs)
+        graph = None
+    # The lexicon lives until the end, so the garbage collector need not
+    # keep scanning it as the checks allocate
+    gc.freeze()
+
+    errors = 0
+    results = run_checks(wn, args.fix, args.prefix, args.jobs, graph=graph)
+    for stdout, stderr, check_errors, _, status in results:
+        sys.stdout.write(stdout)
+        sys.stderr.write(stderr)
+        if status is not None:
+            sys.exit(status)
+        errors += check_errors
+
+    if args.profile:
+        for (name, _), (_, _, check_errors, elapsed, _) in zip(CHECKS, results):
+            sys.stderr.write("%-14s %8.2fs %8d errors\n" %
+                             (name, elapsed, check_errors))
+
+    if args.fix:
         pass
     elif errors > 0:
         print("Validation failed. %d errors" % errors)
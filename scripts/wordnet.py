@@ -1,9 +1,13 @@
 from enum import Enum
-from xml.sax import ContentHandler, parse
+from xml.parsers import expat
 import re
 import sys
-import codecs
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from itertools import chain
+from wordnet_xml import (DEFAULT_BUFFER_SIZE, escape_xml_lit, write_xml,
+                         entry_xml, form_xml, pronunciation_xml, sense_xml,
+                         sense_relation_xml, synset_xml, synset_relation_xml,
+                         definition_xml, example_xml, syntactic_behaviour_xml)
 
 class Lexicon:
     """The Lexicon contains all the synsets and entries"""
@@ -17,9 +21,14 @@ class Lexicon:
         self.version = version
         self.url = url
         self.citation = None
-        self._entries = []
-        self._synsets = []
+        # The entries and synsets in the order they were added, as the keys
+        # of dicts so that any of them is deleted in constant time
+        self._entries = {}
+        self._synsets = {}
         self._pseudo_entries = defaultdict(list)
+        # The lemmas of the members of each synset that have no entry, in
+        # the order of the members
+        self._pseudo_members = defaultdict(list)
         self.frames = []
         self.comments = {}
         self.id2synset = {}
@@ -28,12 +37,17 @@ class Lexicon:
         self.member2entry = {}
         self.members = {}
         self.sense2synset = {}
+        # The IDs of the entries or synsets defined in each source file
+        self.sources = {}
+        # The (source, rel_type, target) triples of the relations that were
+        # not in the source but added as the inverse of another relation
+        self.inferred_relations = set()
 
     def entries(self):
-        return self._entries
+        return self._entries.keys()
 
     def synsets(self):
-        return self._synsets
+        return self._synsets.keys()
 
     def __str__(self):
         return "Lexicon with ID %s and %d entries and %d synsets" % (
@@ -52,37 +66,60 @@ class Lexicon:
         if entry.lemma.written_form not in self.member2entry:
             self.member2entry[entry.lemma.written_form] = []
         self.member2entry[entry.lemma.written_form].append(entry.id)
-        self._entries.append(entry)
+        self._entries[entry] = None
 
     def del_entry(self, entry):
         """Delete an entry and clear all senses"""
-        if entry.id not in self.id2entry:
-            return
-        del self.id2entry[entry.id]
-        for sense in entry.senses:
-            self.del_sense(entry, sense)
-        self.member2entry[entry.lemma.written_form] = [m for m in 
-                self.member2entry[entry.lemma.written_form]
-                    if m != entry.id]
-        if self.member2entry[entry.lemma.written_form] == []:
-            del self.member2entry[entry.lemma.written_form]
-        self._entries = [e for e in self._entries if e.id != entry.id]
+        self.del_entries([entry.id])
+
+    def del_entries(self, ids):
+        """Delete several entries by their IDs and clear all their senses"""
+        for id in set(ids):
+            entry = self.id2entry.pop(id, None)
+            if entry is None:
+                continue
+            for sense in entry.senses:
+                self._del_sense(entry, sense)
+            entry.senses = []
+            self.member2entry[entry.lemma.written_form] = [m for m in 
+                    self.member2entry[entry.lemma.written_form]
+                        if m != entry.id]
+            if self.member2entry[entry.lemma.written_form] == []:
+                del self.member2entry[entry.lemma.written_form]
+            del self._entries[entry]
 
     def del_sense(self, entry, sense):
         """Remove a single sense from an entry"""
+        if self._del_sense(entry, sense):
+            entry.senses = [s for s in entry.senses if s.id != sense.id]
+
+    def _del_sense(self, entry, sense):
+        """Remove a sense from the indexes, but not from its entry. Returns
+        whether the sense was in the lexicon"""
         if sense.id not in self.sense2synset:
-            return
+            return False
         self.members[sense.synset] = [m for m in self.members[sense.synset]
                 if m != entry.lemma.written_form]
         if self.members[sense.synset] == []:
             del self.members[sense.synset]
         del self.sense2synset[sense.id]
         del self.id2sense[sense.id]
-        entry.senses = [s for s in entry.senses if s.id != sense.id]
+        return True
 
     def add_synset(self, synset):
         self.id2synset[synset.id] = synset
-        self._synsets.append(synset)
+        self._synsets[synset] = None
+
+    def del_synset(self, synset):
+        """Delete a synset, the senses referring to it are not changed"""
+        self.del_synsets([synset.id])
+
+    def del_synsets(self, ids):
+        """Delete several synsets by their IDs"""
+        for id in set(ids):
+            synset = self.id2synset.pop(id, None)
+            if synset is not None:
+                del self._synsets[synset]
 
     def entry_by_id(self, id):
         return self.id2entry.get(id)
@@ -96,6 +133,22 @@ class Lexicon:
     def entry_by_lemma(self, lemma):
         return self.member2entry.get(lemma, [])
 
+    def entries_by_ids(self, ids):
+        """The entries with each of `ids`, or None where there is none"""
+        return [self.id2entry.get(id) for id in ids]
+
+    def synsets_by_ids(self, ids):
+        """The synsets with each of `ids`, or None where there is none"""
+        return [self.id2synset.get(id) for id in ids]
+
+    def senses_by_ids(self, ids):
+        """The senses with each of `ids`, or None where there is none"""
+        return [self.id2sense.get(id) for id in ids]
+
+    def entries_by_lemmas(self, lemmas):
+        """The entry IDs with each of `lemmas`"""
+        return [self.member2entry.get(lemma, []) for lemma in lemmas]
+
     def members_by_id(self, synset_id):
         return self.members.get(synset_id, [])
 
@@ -115,8 +168,21 @@ class Lexicon:
                 if s.synset == synset_id:
                     return e
         self._pseudo_entries[(lemma, synset_id[-1])].append(synset_id)
+        self._pseudo_members[synset_id].append(lemma)
         return None
 
+    def pseudo_members(self, synset_id):
+        """The lemmas of the members of a synset that have no entry"""
+        return self._pseudo_members.get(synset_id, [])
+
+    def del_pseudo_members(self, synset_id):
+        """Forget the members of a synset that have no entry"""
+        for lemma in self._pseudo_members.pop(synset_id, []):
+            key = (lemma, synset_id[-1])
+            self._pseudo_entries[key].remove(synset_id)
+            if not self._pseudo_entries[key]:
+                del self._pseudo_entries[key]
+
     def pseudo_entries(self, prefix):
         for (lemma, pos), synsets in self._pseudo_entries:
             entry = LexicalEntry(f"{prefix}-{escape_lemma(lemma)}-{pos}")
@@ -127,55 +193,24 @@ class Lexicon:
                 entry.add_sense(sense)
             yield entry
 
-    def to_xml(self, xml_file, part=False):
-        xml_file.write("""<?xml version="1.0" encoding="UTF-8"?>\n""")
-        if part:
-            xml_file.write(
-                """<!DOCTYPE LexicalResource SYSTEM "http://globalwordnet.github.io/schemas/WN-LMF-relaxed-1.3.dtd">\n""")
-        else:
-            xml_file.write(
-                """<!DOCTYPE LexicalResource SYSTEM "http://globalwordnet.github.io/schemas/WN-LMF-1.3.dtd">\n""")
-        if self.citation:
-            citation_text = f"""
-           citation="{self.citation}" """
-        else:
-            citation_text = ""
-        xml_file.write(
-            """<LexicalResource xmlns:dc="https://globalwordnet.github.io/schemas/dc/">
-  <Lexicon id="%s"
-           label="%s"
-           language="%s"
-           email="%s"
-           license="%s"
-           version="%s"%s
-           url="%s">
-""" %
-            (self.id,
-             self.label,
-             self.language,
-             self.email,
-             self.license,
-             self.version,
-             citation_text,
-             self.url))
-
-        for entry in sorted(self._entries, key=lambda x: x.id):
-            entry.to_xml(xml_file, self.comments)
-        for entry in self.pseudo_entries(self.id):
-            entry.to_xml(xml_file, self.comments)
-        for synset in sorted(self._synsets, key=lambda x: x.id):
-            synset.to_xml(xml_file, self.comments)
-        for synbeh in self.frames:
-            synbeh.to_xml(xml_file)
-        xml_file.write("""  </Lexicon>
-</LexicalResource>\n""")
+    def xml_contents(self):
+        """The entries (followed by the pseudo entries) and the synsets in
+        the order they are written to the XML"""
+        return (chain(sorted(self._entries, key=lambda x: x.id),
+                      self.pseudo_entries(self.id)),
+                sorted(self._synsets, key=lambda x: x.id))
+
+    def to_xml(self, xml_file, part=False, buffer_size=DEFAULT_BUFFER_SIZE):
+        entries, synsets = self.xml_contents()
+        write_xml(xml_file.write, self, entries, synsets, part, buffer_size)
 
 
 class LexicalEntry:
     """The lexical entry consists of a single word"""
+    __slots__ = ("id", "lemma", "forms", "senses", "pronunciation")
 
     def __init__(self, id):
-        self.id = id
+        self.id = sys.intern(id)
         self.lemma = None
         self.forms = []
         self.senses = []
@@ -192,107 +227,78 @@ class LexicalEntry:
             self.senses.append(sense)
 
     def to_xml(self, xml_file, comments):
-        xml_file.write("""    <LexicalEntry id="%s">""" % self.id)
-        if self.pronunciation:
-            xml_file.write("""
-      <Lemma writtenForm="%s" partOfSpeech="%s">
-""" % (escape_xml_lit(self.lemma.written_form), 
-        self.lemma.part_of_speech.value if self.lemma.part_of_speech.value != "s" else "a"))
-            for pron in self.pronunciation:
-                pron.to_xml(xml_file)
-            xml_file.write("""      </Lemma>
-""")
-        else:
-            xml_file.write("""
-      <Lemma writtenForm="%s" partOfSpeech="%s"/>
-""" % (escape_xml_lit(self.lemma.written_form), self.lemma.part_of_speech.value))
-        for form in self.forms:
-            form.to_xml(xml_file)
-        for sense in self.senses:
-            sense.to_xml(xml_file, comments)
-        xml_file.write("""    </LexicalEntry>
-""")
+        out = []
+        entry_xml(self, comments, out)
+        xml_file.write("".join(out))
 
 
 class Lemma:
     """The lemma gives the written form and part of speech of an entry"""
+    __slots__ = ("written_form", "part_of_speech")
 
     def __init__(self, written_form, part_of_speech):
-        self.written_form = written_form
+        self.written_form = sys.intern(written_form)
         self.part_of_speech = part_of_speech
 
 
 class Form:
     """The form gives an inflected form of the entry"""
+    __slots__ = ("written_form",)
 
     def __init__(self, written_form):
         self.written_form = written_form
 
     def to_xml(self, xml_file):
-        xml_file.write("""      <Form writtenForm="%s"/>
-""" % escape_xml_lit(self.written_form))
+        out = []
+        form_xml(self, out)
+        xml_file.write("".join(out))
 
 class Pronunciation:
     """The pronunciation of a lemma"""
+    __slots__ = ("value", "variety")
+
     def __init__(self, value, variety):
         self.value = value
         self.variety = variety
 
     def to_xml(self, xml_file):
-        if self.variety:
-            xml_file.write("""        <Pronunciation variety="%s">%s</Pronunciation>
-""" % (self.variety, escape_xml_lit(self.value)))
-        else:
-            xml_file.write("""        <Pronunciation>%s</Pronunciation>
-""" % (escape_xml_lit(self.value)))
+        out = []
+        pronunciation_xml(self, out)
+        xml_file.write("".join(out))
 
 
 class Sense:
     """The sense links an entry to a synset"""
+    __slots__ = ("id", "synset", "n", "sense_key", "sense_relations",
+                 "adjposition", "sent", "subcat")
 
     def __init__(self, id, synset, sense_key, n=-1, adjposition=None):
-        self.id = id
-        self.synset = synset
+        self.id = sys.intern(id)
+        self.synset = sys.intern(synset)
         self.n = n
         self.sense_key = sense_key
         self.sense_relations = []
         self.adjposition = adjposition
-        self.sent = []
-        self.subcat = []
+        self.sent = ()
+        self.subcat = ()
 
     def add_sense_relation(self, relation):
         self.sense_relations.append(relation)
 
     def to_xml(self, xml_file, comments):
-        if self.adjposition:
-            n_str = " adjposition=\"%s\"" % self.adjposition
-        else:
-            n_str = ""
-        if self.sense_key:
-            sk_str = " dc:identifier=\"%s\"" % escape_xml_lit(self.sense_key)
-        else:
-            sk_str = ""
-        if self.subcat:
-            subcat_str = " subcat=\"%s\"" % " ".join(self.subcat)
-        else:
-            subcat_str = ""
-        if len(self.sense_relations) > 0:
-            xml_file.write("""      <Sense id="%s"%s%s synset="%s"%s>
-""" % (self.id, n_str, subcat_str, self.synset, sk_str))
-            for rel in self.sense_relations:
-                rel.to_xml(xml_file, comments)
-            xml_file.write("""        </Sense>
-""")
-        else:
-            xml_file.write("""      <Sense id="%s"%s%s synset="%s"%s/>
-""" % (self.id, n_str, subcat_str, self.synset, sk_str))
+        out = []
+        sense_xml(self, comments, out)
+        xml_file.write("".join(out))
 
 
 class Synset:
     """The synset is a collection of synonyms"""
+    __slots__ = ("id", "ili", "wikidata", "part_of_speech", "lex_name",
+                 "definitions", "ili_definition", "synset_relations",
+                 "examples", "source", "members")
 
     def __init__(self, id, ili, part_of_speech, lex_name, source=None):
-        self.id = id
+        self.id = sys.intern(id)
         self.ili = ili
         self.wikidata = None
         self.part_of_speech = part_of_speech
@@ -319,102 +325,69 @@ class Synset:
         self.examples.append(example)
 
     def to_xml(self, xml_file, comments):
-        if self.id in comments:
-            xml_file.write("""    <!-- %s -->
-""" % comments[self.id])
-        source_tag = ""
-        if self.source:
-            source_tag = " dc:source=\"%s\"" % (self.source)
-        xml_file.write(
-            """    <Synset id="%s" ili="%s" members="%s" partOfSpeech="%s" lexfile="%s"%s>
-""" %
-            (self.id,
-             self.ili,
-             " ".join(self.members),
-             self.part_of_speech.value,
-             self.lex_name,
-             source_tag))
-        for defn in self.definitions:
-            defn.to_xml(xml_file)
-        if self.ili_definition:
-            self.ili_definition.to_xml(xml_file, True)
-        for rel in self.synset_relations:
-            rel.to_xml(xml_file, comments)
-        for ex in self.examples:
-            ex.to_xml(xml_file)
-        xml_file.write("""    </Synset>
-""")
+        out = []
+        synset_xml(self, comments, out)
+        xml_file.write("".join(out))
 
 
 class Definition:
+    __slots__ = ("text",)
+
     def __init__(self, text):
         self.text = text
 
     def to_xml(self, xml_file, is_ili=False):
-        if is_ili:
-            xml_file.write("""      <ILIDefinition>%s</ILIDefinition>
-""" % escape_xml_lit(self.text))
-        else:
-            xml_file.write("""      <Definition>%s</Definition>
-""" % escape_xml_lit(self.text))
+        out = []
+        definition_xml(self, out, is_ili)
+        xml_file.write("".join(out))
 
     def __eq__(self, other):
         return self.text == other.text
 
 
 class Example:
+    __slots__ = ("text", "source")
+
     def __init__(self, text, source=None):
         self.text = text
         self.source = source
 
     def to_xml(self, xml_file):
-        if self.source:
-            xml_file.write("""      <Example dc:source=\"%s\">%s</Example>
-""" % (escape_xml_lit(self.source), escape_xml_lit(self.text)))
+        out = []
+        example_xml(self, out)
+        xml_file.write("".join(out))
 
-        else:
-            xml_file.write("""      <Example>%s</Example>
-""" % escape_xml_lit(self.text))
 
+class SynsetRelation(namedtuple("SynsetRelation", ("target", "rel_type"))):
+    """A relation to the target synset, stored as a tuple"""
+    __slots__ = ()
 
-class SynsetRelation:
-    def __init__(self, target, rel_type):
-        self.target = target
-        self.rel_type = rel_type
+    def __new__(cls, target, rel_type):
+        return super().__new__(cls, sys.intern(target), rel_type)
 
     def to_xml(self, xml_file, comments):
-        xml_file.write("""      <SynsetRelation relType="%s" target="%s"/>""" %
-                       (self.rel_type.value, self.target))
-        if self.target in comments:
-            xml_file.write(""" <!-- %s -->
-""" % comments[self.target])
-        else:
-            xml_file.write("\n")
+        out = []
+        synset_relation_xml(self, comments, out)
+        xml_file.write("".join(out))
+
 
+class SenseRelation(namedtuple("SenseRelation",
+                                ("target", "rel_type", "other_type"))):
+    """A relation to the target sense, stored as a tuple"""
+    __slots__ = ()
 
-class SenseRelation:
-    def __init__(self, target, rel_type, other_type=None):
-        self.target = target
-        self.rel_type = rel_type
-        self.other_type = other_type
+    def __new__(cls, target, rel_type, other_type=None):
+        return super().__new__(cls, sys.intern(target), rel_type, other_type)
 
     def to_xml(self, xml_file, comments):
-        if self.other_type:
-            xml_file.write(
-                    """        <SenseRelation relType="other" target="%s" dc:type="%s"/>""" %
-                (self.target, self.other_type))
-        else:
-            xml_file.write(
-            """        <SenseRelation relType="%s" target="%s"/>""" %
-            (self.rel_type.value, self.target))
-        if self.target in comments:
-            xml_file.write(""" <!-- %s -->
-""" % comments[self.target])
-        else:
-            xml_file.write("\n")
+        out = []
+        sense_relation_xml(self, comments, out)
+        xml_file.write("".join(out))
 
 
 class SyntacticBehaviour:
+    __slots__ = ("id", "subcategorization_frame")
+
     def __init__(self, id, subcategorization_frame):
         if not isinstance(subcategorization_frame, str):
             raise "Syntactic Behaviour is not string" + \
@@ -423,11 +396,9 @@ class SyntacticBehaviour:
         self.id = id
 
     def to_xml(self, xml_file):
-        xml_file.write(
-            """  <SyntacticBehaviour id="%s" subcategorizationFrame="%s"/>
-""" %
-            (self.id, escape_xml_lit(
-                self.subcategorization_frame)))
+        out = []
+        syntactic_behaviour_xml(self, out)
+        xml_file.write("".join(out))
 
     def __repr__(self):
         return "SyntacticBehaviour(%s, %s)" % (
@@ -646,153 +617,205 @@ inverse_sense_rels = {
 }
 
 
-class WordNetContentHandler(ContentHandler):
+class EnumValues(dict):
+    """The members of an enum by value, which is faster to look up than
+    calling the enum"""
+
+    def __init__(self, enum):
+        super().__init__((member.value, member) for member in enum)
+        self.enum = enum
+
+    def __missing__(self, value):
+        # Let the enum raise the error (or accept an alias)
+        return self.enum(value)
+
+
+class WordNetReader:
+    """Reads a WN-LMF file into a Lexicon in a single pass with expat,
+    collecting the comments on the way"""
+
     def __init__(self):
-        ContentHandler.__init__(self)
         self.lexicon = None
         self.entry = None
         self.sense = None
-        self.defn = None
-        self.ili_defn = None
-        self.example = None
-        self.example_source = None
         self.synset = None
-        self.pron = None
+        # The pieces of the text of the current Definition, Example, etc.
+        self.text = None
+        self.example_source = None
         self.pron_var = None
-
-    def startElement(self, name, attrs):
-        if name == "Lexicon":
-            self.lexicon = Lexicon(
-                attrs["id"],
-                attrs["label"],
-                attrs["language"],
-                attrs["email"],
-                attrs["license"],
-                attrs["version"],
-                attrs["url"])
-        elif name == "LexicalEntry":
-            self.entry = LexicalEntry(attrs["id"])
-        elif name == "Lemma":
-            self.entry.set_lemma(
-                Lemma(
-                    attrs["writtenForm"],
-                    PartOfSpeech(
-                        attrs["partOfSpeech"])))
-        elif name == "Form":
-            self.entry.add_form(Form(attrs["writtenForm"]))
-        elif name == "Sense":
-            if "n" in attrs:
-                n = int(attrs["n"])
-            else:
-                n = -1
-            self.sense = Sense(attrs["id"], attrs["synset"], attrs.get(
-                "dc:identifier") or "", n, attrs.get("adjposition"))
-        elif name == "Synset":
-            self.synset = Synset(attrs["id"], attrs["ili"],
-                                 PartOfSpeech(attrs["partOfSpeech"]),
-                                 attrs.get("lexfile", attrs.get("dc:subject", "")),
-                                 attrs.get("dc:source", ""))
-            self.synset.members = attrs.get("members", "").split(" ")
-        elif name == "Definition":
-            self.defn = ""
-        elif name == "ILIDefinition":
-            self.ili_defn = ""
-        elif name == "Example":
-            self.example = ""
-            self.example_source = attrs.get("dc:source")
-        elif name == "SynsetRelation":
-            self.synset.add_synset_relation(
-                SynsetRelation(attrs["target"],
-                               SynsetRelType(attrs["relType"])))
-        elif name == "SenseRelation":
-            self.sense.add_sense_relation(
-                SenseRelation(attrs["target"],
-                              SenseRelType(attrs["relType"]),
-                              attrs.get("dc:type")))
-        elif name == "SyntacticBehaviour":
-            pass
-            #self.entry.add_syntactic_behaviour(
-            #    SyntacticBehaviour(
-            #        attrs["subcategorizationFrame"],
-            #        attrs["senses"].split(" ")))
-        elif name == "Pronunciation":
-            self.pron = ""
-            self.pron_var = attrs.get("variety")
-        elif name == "LexicalResource":
-            pass
-        else:
+        # The line and target of the last relation, a comment on the same
+        # line is about the target of the relation
+        self.rel_line = None
+        self.rel_target = None
+        # A comment on its own line, which is about the next synset
+        self.comment = None
+        self.parts_of_speech = EnumValues(PartOfSpeech)
+        self.sense_rel_types = EnumValues(SenseRelType)
+        self.synset_rel_types = EnumValues(SynsetRelType)
+        self.parser = expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.buffer_size = 0x10000
+        self.parser.StartElementHandler = self.start_element
+        self.parser.EndElementHandler = self.end_element
+        self.parser.CharacterDataHandler = self.characters
+        self.parser.CommentHandler = self.handle_comment
+        self.start_handlers = {
+            "LexicalResource": lambda attrs: None,
+            "Lexicon": self.start_lexicon,
+            "LexicalEntry": self.start_entry,
+            "Lemma": self.start_lemma,
+            "Form": self.start_form,
+            "Pronunciation": self.start_pronunciation,
+            "Sense": self.start_sense,
+            "SenseRelation": self.start_sense_relation,
+            "Synset": self.start_synset,
+            "Definition": self.start_text,
+            "ILIDefinition": self.start_text,
+            "Example": self.start_example,
+            "SynsetRelation": self.start_synset_relation,
+            "SyntacticBehaviour": lambda attrs: None,
+        }
+        self.end_handlers = {
+            "LexicalEntry": self.end_entry,
+            "Sense": self.end_sense,
+            "Synset": self.end_synset,
+            "Definition": self.end_definition,
+            "ILIDefinition": self.end_ili_definition,
+            "Example": self.end_example,
+            "Pronunciation": self.end_pronunciation,
+        }
+
+    def parse(self, source):
+        """Parse a binary file object and return the Lexicon"""
+        self.parser.ParseFile(source)
+        return self.lexicon
+
+    def start_element(self, name, attrs):
+        handler = self.start_handlers.get(name)
+        if handler is None:
             raise ValueError("Unexpected Tag: " + name)
+        handler(attrs)
 
-    def endElement(self, name):
-        if name == "LexicalEntry":
-            self.lexicon.add_entry(self.entry)
-            self.entry = None
-        elif name == "Sense":
-            self.entry.add_sense(self.sense)
-            self.sense = None
-        elif name == "Synset":
-            self.lexicon.add_synset(self.synset)
-            self.synset = None
-        elif name == "Definition":
-            self.synset.add_definition(Definition(self.defn))
-            self.defn = None
-        elif name == "ILIDefinition":
-            self.synset.add_definition(Definition(self.ili_defn), True)
-            self.ili_defn = None
-        elif name == "Example":
-            self.synset.add_example(Example(self.example, self.example_source))
-            self.example = None
-        elif name == "Pronunciation":
-            self.entry.pronunciation.append(Pronunciation(self.pron, self.pron_var))
-            self.pron = None
+    def end_element(self, name):
+        handler = self.end_handlers.get(name)
+        if handler is not None:
+            handler()
 
     def characters(self, content):
-        if self.defn is not None:
-            self.defn += content
-        elif self.ili_defn is not None:
-            self.ili_defn += content
-        elif self.example is not None:
-            self.example += content
-        elif self.pron is not None:
-            self.pron += content
+        if self.text is not None:
+            self.text.append(content)
         elif content.strip() == '':
             pass
         else:
             print(content)
             raise ValueError("Text content not expected")
 
+    def handle_comment(self, data):
+        if data.startswith(" "):
+            data = data[1:]
+        if data.endswith(" "):
+            data = data[:-1]
+        if self.rel_line == self.parser.CurrentLineNumber:
+            self.lexicon.comments[self.rel_target] = data
+        else:
+            self.comment = data
+
+    def start_lexicon(self, attrs):
+        self.lexicon = Lexicon(
+            attrs["id"],
+            attrs["label"],
+            attrs["language"],
+            attrs["email"],
+            attrs["license"],
+            attrs["version"],
+            attrs["url"])
+
+    def start_entry(self, attrs):
+        self.entry = LexicalEntry(attrs["id"])
+
+    def end_entry(self):
+        self.lexicon.add_entry(self.entry)
+        self.entry = None
+
+    def start_lemma(self, attrs):
+        self.entry.set_lemma(
+            Lemma(
+                attrs["writtenForm"],
+                self.parts_of_speech[attrs["partOfSpeech"]]))
 
-def escape_xml_lit(lit):
-    return (lit.replace("&", "&amp;").replace("'", "&apos;").
-            replace("\"", "&quot;").replace("<", "&lt;").replace(">", "&gt;"))
-
-
-def extract_comments(wordnet_file, lexicon):
-    with codecs.open(wordnet_file, "r", encoding="utf-8") as source:
-        sen_rel_comment = re.compile(
-            ".*<SenseRelation .* target=\"(.*)\".*/> <!-- (.*) -->")
-        syn_rel_comment = re.compile(
-            ".*<SynsetRelation .* target=\"(.*)\".*/> <!-- (.*) -->")
-        comment = re.compile(".*<!-- (.*) -->.*")
-        synset = re.compile(".*<Synset id=\"(\\S*)\".*")
-        c = None
-        for line in source.readlines():
-            m = sen_rel_comment.match(line)
-            if m:
-                lexicon.comments[m.group(1)] = m.group(2)
-            else:
-                m = syn_rel_comment.match(line)
-                if m:
-                    lexicon.comments[m.group(1)] = m.group(2)
-                else:
-                    m = comment.match(line)
-                    if m:
-                        c = m.group(1)
-                    else:
-                        m = synset.match(line)
-                        if m and c:
-                            lexicon.comments[m.group(1)] = c
-                            c = None
+    def start_form(self, attrs):
+        self.entry.add_form(Form(attrs["writtenForm"]))
+
+    def start_pronunciation(self, attrs):
+        self.text = []
+        self.pron_var = attrs.get("variety")
+
+    def end_pronunciation(self):
+        self.entry.pronunciation.append(
+            Pronunciation("".join(self.text), self.pron_var))
+        self.text = None
+
+    def start_sense(self, attrs):
+        if "n" in attrs:
+            n = int(attrs["n"])
+        else:
+            n = -1
+        self.sense = Sense(attrs["id"], attrs["synset"], attrs.get(
+            "dc:identifier") or "", n, attrs.get("adjposition"))
+
+    def end_sense(self):
+        self.entry.add_sense(self.sense)
+        self.sense = None
+
+    def start_sense_relation(self, attrs):
+        self.sense.add_sense_relation(
+            SenseRelation(attrs["target"],
+                          self.sense_rel_types[attrs["relType"]],
+                          attrs.get("dc:type")))
+        self.rel_line = self.parser.CurrentLineNumber
+        self.rel_target = attrs["target"]
+
+    def start_synset(self, attrs):
+        self.synset = Synset(attrs["id"], attrs["ili"],
+                             self.parts_of_speech[attrs["partOfSpeech"]],
+                             attrs.get("lexfile", attrs.get("dc:subject", "")),
+                             attrs.get("dc:source", ""))
+        self.synset.members = [sys.intern(member) for member
+                               in attrs.get("members", "").split(" ")]
+        if self.comment is not None:
+            self.lexicon.comments[self.synset.id] = self.comment
+            self.comment = None
+
+    def end_synset(self):
+        self.lexicon.add_synset(self.synset)
+        self.synset = None
+
+    def start_text(self, attrs):
+        self.text = []
+
+    def end_definition(self):
+        self.synset.add_definition(Definition("".join(self.text)))
+        self.text = None
+
+    def end_ili_definition(self):
+        self.synset.add_definition(Definition("".join(self.text)), True)
+        self.text = None
+
+    def start_example(self, attrs):
+        self.text = []
+        self.example_source = attrs.get("dc:source")
+
+    def end_example(self):
+        self.synset.add_example(
+            Example("".join(self.text), self.example_source))
+        self.text = None
+
+    def start_synset_relation(self, attrs):
+        self.synset.add_synset_relation(
+            SynsetRelation(attrs["target"],
+                           self.synset_rel_types[attrs["relType"]]))
+        self.rel_line = self.parser.CurrentLineNumber
+        self.rel_target = attrs["target"]
 
 
 # Regular expressions for valid NameChar
@@ -822,42 +845,58 @@ xml_id_not_first = (
 xml_id_char = fr'[_\-\.·{xml_id_az}{xml_id_num}{xml_id_extend}{xml_id_not_first}]'
 xml_id_char_re = re.compile(xml_id_char)
 
+def escape_lemma_char(c):
+    """Format a character of a lemma so it is valid in an XML id"""
+    if ('A' <= c <= 'Z') or ('a' <= c <= 'z') or ('0' <= c <= '9') or c == '.':
+        return c
+    elif c == ' ':
+        return '_'
+    elif c == '(':
+        return '-lb-'
+    elif c == ')':
+        return '-rb-'
+    elif c == '\'':
+        return '-ap-'
+    elif c == '/':
+        return '-sl-'
+    elif c == ':':
+        return '-cn-'
+    elif c == ',':
+        return '-cm-'
+    elif c == '!':
+        return '-ex-'
+    elif c == '+':
+        return '-pl-'
+    elif c == '%':
+        return '-pc-'
+    elif xml_id_char_re.match(c):
+        return c
+    else:
+        return '-u%04X-' % ord(c)
+
+
+class LemmaEscapes(dict):
+    """The `str.translate` table of `escape_lemma`, precomputed for ASCII
+    and the Latin ranges and filled in for other characters as they are
+    met"""
+
+    def __init__(self, size=0x250):
+        super().__init__((code, escape_lemma_char(chr(code)))
+                         for code in range(size))
+
+    def __missing__(self, code):
+        escape = self[code] = escape_lemma_char(chr(code))
+        return escape
+
+
+lemma_escapes = LemmaEscapes()
+
+
 def escape_lemma(lemma):
     """Format the lemma so it is valid XML id"""
-    def elc(c):
-        if ('A' <= c <= 'Z') or ('a' <= c <= 'z') or ('0' <= c <= '9') or c == '.':
-            return c
-        elif c == ' ':
-            return '_'
-        elif c == '(':
-            return '-lb-'
-        elif c == ')':
-            return '-rb-'
-        elif c == '\'':
-            return '-ap-'
-        elif c == '/':
-            return '-sl-'
-        elif c == ':':
-            return '-cn-'
-        elif c == ',':
-            return '-cm-'
-        elif c == '!':
-            return '-ex-'
-        elif c == '+':
-            return '-pl-'
-        elif c == '%':
-            return '-pc-'
-        elif xml_id_char_re.match(c):
-            return c
-        else:
-            return '-u%04X-' % ord(c)
-
-    return "".join(elc(c) for c in lemma)
+    return lemma.translate(lemma_escapes)
 
 
 def parse_wordnet(wordnet_file):
-    with codecs.open(wordnet_file, "r", encoding="utf-8") as source:
-        handler = WordNetContentHandler()
-        parse(source, handler)
-    extract_comments(wordnet_file, handler.lexicon)
-    return handler.lexicon
+    with open(wordnet_file, "rb") as source:
+        return WordNetReader().parse(source)
@@ -0,0 +1,387 @@
+"""A columnar store of the relations of a loaded lexicon.
+
+The synsets and senses are numbered densely in the order of the lexicon and
+the relations of each type are kept in compressed sparse row (CSR) form: the
+targets of the node `i` are `targets[offsets[i]:offsets[i + 1]]`, where both
+are `array`s of machine integers. The neighbours of a node are found
+without resolving any IDs or looking at the relations of other types.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from operator import add, sub
+
+from wordnet import SynsetRelType
+
+# The typecode of the arrays of node numbers and offsets
+INDEX_TYPE = "I"
+
+
+def zeros(n):
+    """An index array of `n` zeros"""
+    return array(INDEX_TYPE, bytes(n * array(INDEX_TYPE).itemsize))
+
+
+class RelationCSR:
+    """The relations of one type between `n` nodes, in CSR form"""
+    __slots__ = ("offsets", "targets")
+
+    def __init__(self, offsets, targets):
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def from_edges(cls, n, sources, targets):
+        """
+        Build the CSR from the parallel arrays of the sources and targets
+        of the edges, which must be ordered by source
+        """
+        counts = [0] * (n + 1)
+        for i in sources:
+            counts[i + 1] += 1
+        return cls(array(INDEX_TYPE, accumulate(counts)), targets)
+
+    def __len__(self):
+        """The number of nodes"""
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """The targets of the node `i`"""
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def sources(self):
+        """The source of each relation, parallel to `targets`"""
+        offsets = self.offsets
+        return array(INDEX_TYPE, (bisect_right(offsets, k) - 1
+                                  for k in range(len(self.targets))))
+
+    def edges(self):
+        """Iterate the (source, target) pairs of all the relations"""
+        return zip(self.sources(), self.targets)
+
+    def degrees(self):
+        """The number of targets of each node"""
+        return array(INDEX_TYPE, map(sub, self.offsets[1:], self.offsets[:-1]))
+
+    def in_degrees(self):
+        """The number of sources of each node"""
+        counts = zeros(len(self))
+        for j in self.targets:
+            counts[j] += 1
+        return counts
+
+    def inverse(self):
+        """The CSR of the relations reversed, with the sources of each node
+        in ascending order"""
+        offsets = array(INDEX_TYPE, [0])
+        offsets.extend(accumulate(self.in_degrees()))
+        sources = zeros(len(self.targets))
+        fill = offsets[:-1]
+        for i, j in self.edges():
+            sources[fill[j]] = i
+            fill[j] += 1
+        return RelationCSR(offsets, sources)
+
+    def union(self, *others):
+        """The CSR with the relations of this and the other CSRs (over the
+        same nodes)"""
+        offsets = self.offsets
+        for csr in others:
+            offsets = array(INDEX_TYPE, map(add, offsets, csr.offsets))
+        targets = zeros(offsets[-1])
+        fill = offsets[:-1]
+        for csr in (self,) + others:
+            for i, j in csr.edges():
+                targets[fill[i]] = j
+                fill[i] += 1
+        return RelationCSR(offsets, targets)
+
+
+class RelationsByType(dict):
+    """
+    The CSRs of the relations between `n` nodes by type. Only the types
+    that occur are stored, the others share one empty CSR
+    """
+
+    def __init__(self, n, csrs):
+        super().__init__(csrs)
+        self.empty = RelationCSR(zeros(n + 1), array(INDEX_TYPE))
+
+    def __missing__(self, rel_type):
+        return self.empty
+
+
+def relations_csr(nodes, index, relations_attr, missing):
+    """
+    Build the CSRs of the `relations_attr` relations of `nodes` by type,
+    numbering the targets with `index`. Relations to targets that are not in
+    the index are appended to `missing` as (source, rel_type, target) triples
+    """
+    edges = {}
+    for i, node in enumerate(nodes):
+        for rel in getattr(node, relations_attr):
+            j = index.get(rel.target)
+            if j is None:
+                missing.append((node.id, rel.rel_type, rel.target))
+                continue
+            if rel.rel_type not in edges:
+                edges[rel.rel_type] = (array(INDEX_TYPE), array(INDEX_TYPE))
+            sources, targets = edges[rel.rel_type]
+            sources.append(i)
+            targets.append(j)
+    return RelationsByType(len(nodes), {
+        rel_type: RelationCSR.from_edges(len(nodes), sources, targets)
+        for rel_type, (sources, targets) in edges.items()})
+
+
+class RelationGraph:
+    """
+    The synset and sense relations of a lexicon (a Lexicon or an SQLLexicon)
+    over dense integer IDs. The graph is a snapshot and does not follow
+    later changes to the lexicon
+    """
+
+    def __init__(self, lexicon):
+        synsets = list(lexicon.synsets())
+        senses = [sense for entry in lexicon.entries()
+                  for sense in entry.senses]
+        self.synset_ids = [synset.id for synset in synsets]
+        self.synset_index = {id: i for i, id in enumerate(self.synset_ids)}
+        self.sense_ids = [sense.id for sense in senses]
+        self.sense_index = {id: i for i, id in enumerate(self.sense_ids)}
+        # The synset of each sense, or the number of synsets if the sense
+        # refers to a synset that does not exist
+        self.sense_synsets = array(INDEX_TYPE, (
+            self.synset_index.get(sense.synset, len(synsets))
+            for sense in senses))
+        # The relations whose target does not exist
+        self.missing_synset_targets = []
+        self.missing_sense_targets = []
+        self.synset_relations = relations_csr(
+            synsets, self.synset_index, "synset_relations",
+            self.missing_synset_targets)
+        self.sense_relations = relations_csr(
+            senses, self.sense_index, "sense_relations",
+            self.missing_sense_targets)
+
+    def __str__(self):
+        return "Relation graph of %d synsets and %d senses" % (
+            len(self.synset_ids), len(self.sense_ids))
+
+    def synset_targets(self, synset_id, rel_type):
+        """The IDs of the targets of the relations of a type from a synset"""
+        csr = self.synset_relations[rel_type]
+        return [self.synset_ids[j] for j in csr[self.synset_index[synset_id]]]
+
+    def sense_targets(self, sense_id, rel_type):
+        """The IDs of the targets of the relations of a type from a sense"""
+        csr = self.sense_relations[rel_type]
+        return [self.sense_ids[j] for j in csr[self.sense_index[sense_id]]]
+
+
+def strongly_connected_components(csr, nodes=None):
+    """
+    The strongly connected components of the graph of a CSR, or of the
+    subgraph of the given nodes, each as a list of nodes. This is Tarjan's
+    algorithm with an explicit stack, so the components come out in reverse
+    topological order
+    """
+    n = len(csr)
+    offsets, targets = csr.offsets, csr.targets
+    if nodes is None:
+        nodes = range(n)
+        included = None
+    else:
+        included = bytearray(n)
+        for i in nodes:
+            included[i] = 1
+    numbers = array("i", [-1]) * n
+    lowlinks = zeros(n)
+    on_stack = bytearray(n)
+    stack = []
+    components = []
+    counter = 0
+    for root in nodes:
+        if numbers[root] >= 0:
+            continue
+        numbers[root] = lowlinks[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        # The nodes being visited, with the position of their next edge
+        work = [[root, offsets[root]]]
+        while work:
+            frame = work[-1]
+            i, k = frame
+            end = offsets[i + 1]
+            while k < end:
+                j = targets[k]
+                k += 1
+                if included is not None and not included[j]:
+                    continue
+                if numbers[j] < 0:
+                    break
+                if on_stack[j] and numbers[j] < lowlinks[i]:
+                    lowlinks[i] = numbers[j]
+            else:
+                work.pop()
+                if work and lowlinks[i] < lowlinks[work[-1][0]]:
+                    lowlinks[work[-1][0]] = lowlinks[i]
+                if lowlinks[i] == numbers[i]:
+                    component = []
+                    while True:
+                        j = stack.pop()
+                        on_stack[j] = 0
+                        component.append(j)
+                        if j == i:
+                            break
+                    components.append(component)
+                continue
+            frame[1] = k
+            numbers[j] = lowlinks[j] = counter
+            counter += 1
+            stack.append(j)
+            on_stack[j] = 1
+            work.append([j, offsets[j]])
+    return components
+
+
+def find_cycles(csr, nodes=None):
+    """
+    One cycle of each strongly connected component of the graph of a CSR (or
+    of the subgraph of the given nodes) that has any, as the list of its
+    nodes where each is followed by one of its targets, starting from the
+    lowest. The cycles are sorted by their first node
+    """
+    if nodes is None:
+        # Only nodes with both sources and targets can be on a cycle
+        nodes = [i for i, (out, into) in enumerate(zip(csr.degrees(),
+                                                        csr.in_degrees()))
+                 if out and into]
+    cycles = []
+    for component in strongly_connected_components(csr, nodes):
+        members = set(component)
+        start = min(component)
+        if len(component) == 1 and start not in csr[start]:
+            continue
+        # Every node of the component has a target in it, so following
+        # them leads around a cycle
+        path = []
+        seen = {}
+        i = start
+        while i not in seen:
+            seen[i] = len(path)
+            path.append(i)
+            i = next(j for j in csr[i] if j in members)
+        cycle = path[seen[i]:]
+        first = cycle.index(min(cycle))
+        cycles.append(cycle[first:] + cycle[:first])
+    cycles.sort()
+    return cycles
+
+
+def topological_order(parents):
+    """
+    Order the nodes of the `parents` CSR so that every node comes after all
+    of its parents. Nodes on or below a cycle cannot be ordered; the cycles
+    are returned too, as by `find_cycles`
+    """
+    n = len(parents)
+    # The number of parents of each node that have not been ordered yet
+    pending = parents.degrees()
+    children = parents.inverse()
+    order = [i for i in range(n) if not pending[i]]
+    for i in order:
+        for j in children[i]:
+            pending[j] -= 1
+            if not pending[j]:
+                order.append(j)
+    cycles = []
+    if len(order) < n:
+        ordered = bytearray(n)
+        for i in order:
+            ordered[i] = 1
+        cycles = find_cycles(parents, [i for i in range(n) if not ordered[i]])
+    return order, cycles
+
+
+class HypernymClosure:
+    """
+    The transitive closure of the hypernym relation of a RelationGraph. The
+    ancestors of each synset are kept as a sorted array in CSR form, so that
+    `is_ancestor` is a binary search. The synsets on or below a hypernym
+    loop have no closure; they are reported in `loops` and queries on them
+    raise a ValueError
+    """
+
+    def __init__(self, graph, rel_types=(SynsetRelType.HYPERNYM,)):
+        self.graph = graph
+        first, *rest = [graph.synset_relations[rel_type]
+                        for rel_type in rel_types]
+        parents = first.union(*rest) if rest else first
+        n = len(parents)
+        order, cycles = topological_order(parents)
+        self.loops = [[graph.synset_ids[i] for i in cycle]
+                      for cycle in cycles]
+        # The length of the longest path to a root, or -1 if the synset
+        # has no closure
+        self.depths = array("i", [-1]) * n
+        # The closures are kept as arrays while they are built, which are
+        # smaller than sets and not tracked by the garbage collector
+        ancestors = [None] * n
+        for i in order:
+            closure = set(parents[i])
+            depth = 0
+            for j in parents[i]:
+                closure.update(ancestors[j])
+                depth = max(depth, self.depths[j] + 1)
+            ancestors[i] = array(INDEX_TYPE, sorted(closure))
+            self.depths[i] = depth
+        offsets = array(INDEX_TYPE, [0])
+        targets = array(INDEX_TYPE)
+        for closure in ancestors:
+            if closure is not None:
+                targets.extend(closure)
+            offsets.append(len(targets))
+        self.ancestors_csr = RelationCSR(offsets, targets)
+
+    def index(self, synset_id):
+        """The number of a synset that has a closure"""
+        i = self.graph.synset_index[synset_id]
+        if self.depths[i] < 0:
+            raise ValueError("%s is in or below a hypernym loop" % synset_id)
+        return i
+
+    def ancestors(self, synset_id):
+        """The IDs of all the (transitive) hypernyms of a synset"""
+        synset_ids = self.graph.synset_ids
+        return [synset_ids[j] for j in self.ancestors_csr[self.index(synset_id)]]
+
+    def is_ancestor(self, ancestor_id, synset_id):
+        """Whether a synset is a (transitive) hypernym of another"""
+        i = self.graph.synset_index[ancestor_id]
+        j = self.index(synset_id)
+        offsets, targets = self.ancestors_csr.offsets, self.ancestors_csr.targets
+        k = bisect_left(targets, i, offsets[j], offsets[j + 1])
+        return k < offsets[j + 1] and targets[k] == i
+
+    def depth(self, synset_id):
+        """The length of the longest hypernym path from a synset to a root"""
+        return self.depths[self.index(synset_id)]
+
+    def lowest_common_hypernyms(self, synset_id1, synset_id2):
+        """
+        The deepest synsets that are (transitive) hypernyms of both synsets,
+        where each synset counts as its own hypernym
+        """
+        i, j = self.index(synset_id1), self.index(synset_id2)
+        common = set(self.ancestors_csr[i])
+        common.add(i)
+        others = set(self.ancestors_csr[j])
+        others.add(j)
+        common &= others
+        if not common:
+            return []
+        depth = max(self.depths[k] for k in common)
+        synset_ids = self.graph.synset_ids
+        return sorted(synset_ids[k] for k in common if self.depths[k] == depth)
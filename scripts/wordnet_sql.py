@@ -1,17 +1,272 @@
+from collections import OrderedDict
 from enum import Enum
 from xml.sax import ContentHandler, parse
 import re
 import sys
 import codecs
 import sqlite3
-import pickle
-from wordnet import LexicalEntry, Synset, Sense, escape_lemma, Lemma, PartOfSpeech
+from functools import lru_cache
+from itertools import chain
+from wordnet_xml import DEFAULT_BUFFER_SIZE, write_xml
+from wordnet import (LexicalEntry, Synset, Sense, escape_lemma, Lemma,
+                     PartOfSpeech, Form, Pronunciation, Definition, Example,
+                     SynsetRelation, SenseRelation, SynsetRelType,
+                     SenseRelType, EnumValues)
+
+# The tables of the lexicon. Entries, senses and synsets are numbered by
+# their rowid, which the tables of their parts refer to, and the parts are
+# kept in order by their index. Synsets and senses are referred to by their
+# ID from the senses and the relations, as these may point to a synset or
+# sense that is added later or does not exist
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        rowid INTEGER PRIMARY KEY,
+        id TEXT NOT NULL UNIQUE,
+        lemma TEXT NOT NULL,
+        pos TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS forms (
+        entry INTEGER NOT NULL REFERENCES entries (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        written_form TEXT NOT NULL,
+        PRIMARY KEY (entry, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS pronunciations (
+        entry INTEGER NOT NULL REFERENCES entries (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        value TEXT NOT NULL,
+        variety TEXT,
+        PRIMARY KEY (entry, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS senses (
+        rowid INTEGER PRIMARY KEY,
+        id TEXT NOT NULL UNIQUE,
+        entry INTEGER NOT NULL REFERENCES entries (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        synset_id TEXT NOT NULL,
+        n INTEGER,
+        sense_key TEXT,
+        adjposition TEXT
+    );
+    CREATE TABLE IF NOT EXISTS sense_relations (
+        sense INTEGER NOT NULL REFERENCES senses (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        target TEXT NOT NULL,
+        rel_type TEXT NOT NULL,
+        other_type TEXT,
+        PRIMARY KEY (sense, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS sense_subcats (
+        sense INTEGER NOT NULL REFERENCES senses (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        frame TEXT NOT NULL,
+        PRIMARY KEY (sense, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS sense_sents (
+        sense INTEGER NOT NULL REFERENCES senses (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        PRIMARY KEY (sense, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS synsets (
+        rowid INTEGER PRIMARY KEY,
+        id TEXT NOT NULL UNIQUE,
+        ili TEXT,
+        pos TEXT NOT NULL,
+        lex_name TEXT,
+        source TEXT,
+        ili_definition TEXT,
+        -- Whether the Wikidata IDs were given as a list rather than one ID
+        wikidata_list INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS definitions (
+        synset INTEGER NOT NULL REFERENCES synsets (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        PRIMARY KEY (synset, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS examples (
+        synset INTEGER NOT NULL REFERENCES synsets (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        source TEXT,
+        PRIMARY KEY (synset, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS synset_relations (
+        synset INTEGER NOT NULL REFERENCES synsets (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        target TEXT NOT NULL,
+        rel_type TEXT NOT NULL,
+        PRIMARY KEY (synset, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS synset_members (
+        synset INTEGER NOT NULL REFERENCES synsets (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        entry_id TEXT,
+        PRIMARY KEY (synset, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS synset_wikidata (
+        synset INTEGER NOT NULL REFERENCES synsets (rowid) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        qid TEXT NOT NULL,
+        PRIMARY KEY (synset, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS members (
+        member TEXT,
+        entry_id TEXT,
+        synset_id TEXT,
+        pos TEXT
+    );
+    -- Needed while loading, to find the entries of the members of synsets
+    CREATE INDEX IF NOT EXISTS idx_members_member ON members (member);
+    -- Needed while loading, to read the senses of the entries in batches
+    CREATE INDEX IF NOT EXISTS idx_senses_entry ON senses (entry, idx);
+    -- The source files of the lexicon as they were when last loaded, and
+    -- the IDs of the entries or synsets that each of them defines
+    CREATE TABLE IF NOT EXISTS sources (
+        file TEXT PRIMARY KEY,
+        mtime_ns INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        digest TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS source_ids (
+        file TEXT NOT NULL REFERENCES sources (file) ON DELETE CASCADE,
+        idx INTEGER NOT NULL,
+        id TEXT NOT NULL,
+        PRIMARY KEY (file, idx)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS properties (
+        name TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+# The indexes that are only used once the lexicon is loaded, which a bulk
+# load creates at the end rather than updating for every row
+INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_senses_synset_id ON senses (synset_id);
+    CREATE INDEX IF NOT EXISTS idx_sense_relations_target
+    ON sense_relations (target);
+    CREATE INDEX IF NOT EXISTS idx_synset_relations_target
+    ON synset_relations (target);
+    CREATE INDEX IF NOT EXISTS idx_members_synset_id ON members (synset_id);
+    CREATE INDEX IF NOT EXISTS idx_members_entry_id ON members (entry_id);
+    CREATE INDEX IF NOT EXISTS idx_source_ids_id ON source_ids (id);
+"""
+
+# The page cache of a bulk load, in KiB
+BULK_LOAD_CACHE_SIZE = 256 * 1024
+
+# The number of entries, senses and synsets each kept decoded by a lexicon
+OBJECT_CACHE_SIZE = 10000
+
+# The number of IDs looked up in one query by the batch lookups. The parts
+# query of a batch has a parameter for each owner in each of its arms, which
+# must stay below the limit of SQLite (32766 by default)
+LOOKUP_CHUNK_SIZE = 250
+
+# The number of entries or synsets read at a time when iterating over all of
+# them. Only these are decoded at once, so this bounds the memory used by
+# an export whatever the size of the lexicon
+ARRAYSIZE = 1000
+
+parts_of_speech = EnumValues(PartOfSpeech)
+sense_rel_types = EnumValues(SenseRelType)
+synset_rel_types = EnumValues(SynsetRelType)
+
+
+@lru_cache(maxsize=256)
+def parts_sql(arms):
+    """The query of `SQLLexicon._parts`, given the number of owners of each
+    arm rather than their rowids"""
+    width = max(len(columns) for _, _, columns, _ in arms)
+    selects = []
+    for arm, (table, owner, columns, count) in enumerate(arms):
+        values = ", ".join(columns + ("NULL",) * (width - len(columns)))
+        select = f"SELECT {arm}, {owner}, idx, {values} FROM {table}"
+        if count is not None:
+            select += f" WHERE {owner} IN ({', '.join('?' * count)})"
+        selects.append(select)
+    return " UNION ALL ".join(selects) + " ORDER BY 1, 2, 3"
+
+
+def padded(values):
+    """
+    The list of `values` padded with NULLs to a power of two in length. The
+    queries with an IN list then come in only a few lengths, which keeps
+    sqlite3 from filling its statement cache with large statements that
+    differ only in the number of parameters
+    """
+    values = list(values)
+    return values + [None] * ((1 << (len(values) - 1).bit_length()) - len(values))
+
+
+def in_sql(column, values):
+    """A condition that `column` is one of `values`, with its parameters"""
+    params = padded(values)
+    return f"{column} IN ({', '.join('?' * len(params))})", params
+
+
+def new_sense(id, synset, n, sense_key, adjposition):
+    """A sense read from the database, before its parts are added"""
+    sense = Sense(id, synset, sense_key, n, adjposition)
+    # As for a sense read from YAML without any sentences
+    sense.sent = None
+    return sense
+
+
+class ObjectCache:
+    """
+    The most recently read objects by ID, of which the least recently used
+    is dropped once there are more than `maxsize`. `hits` and `misses` count
+    the lookups that did and did not find their object
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.objects = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, id):
+        obj = self.objects.get(id)
+        if obj is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.objects.move_to_end(id)
+        return obj
+
+    def put(self, id, obj):
+        if self.maxsize <= 0:
+            return
+        self.objects[id] = obj
+        if len(self.objects) > self.maxsize:
+            self.objects.popitem(last=False)
+
+    def discard(self, id):
+        self.objects.pop(id, None)
+
+    def clear(self):
+        self.objects.clear()
+
+    def info(self):
+        """The (hits, misses, maxsize, currsize) of the cache"""
+        return (self.hits, self.misses, self.maxsize, len(self.objects))
 
 
 class SQLLexicon:
-    """The Lexicon contains all the synsets and entries"""
+    """
+    The Lexicon contains all the synsets and entries. `cache_size` is the
+    number of entries and synsets that are added before they are written to
+    the database, and `object_cache_size` the number of entries, senses and
+    synsets each that are kept after they are read by ID. As in `Lexicon`,
+    a lookup by ID may return the same object as an earlier one, but
+    changes to that object are not written to the database
+    """
 
-    def __init__(self, id, label, language, email, license, version, url, db, cache_size=1000000):
+    def __init__(self, id, label, language, email, license, version, url, db, cache_size=1000000,
+                 bulk_load=False, object_cache_size=OBJECT_CACHE_SIZE):
         self.id = id
         self.label = label
         self.language = language
@@ -26,65 +281,246 @@ class SQLLexicon:
         self._dirty_synsets = []
         self._dirty_pseudo_entries = []
         self.cache_size = cache_size
+        self.arraysize = ARRAYSIZE
+        self.entry_cache = ObjectCache(object_cache_size)
+        self.sense_cache = ObjectCache(object_cache_size)
+        self.synset_cache = ObjectCache(object_cache_size)
         self.conn = db
         self.conn.execute("""
             PRAGMA foreign_keys = ON;
         """)
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS entries (
-                id TEXT PRIMARY KEY,
-                value BLOB NOT NULL
-            )""")
-        self.conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_entries_id
-            ON entries (id)
-            """)
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS members (
-                member TEXT,
-                entry_id TEXT,
-                synset_id TEXT,
-                pos TEXT
-                )""")
-        self.conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_members_member
-            ON members (member)
-            """)
-        self.conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_members_synset_id
-            ON members (synset_id)
-            """)
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS synsets (
-                id TEXT PRIMARY KEY,
-                value BLOB NOT NULL
-            )""")
-        self.conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_synsets_id
-            ON synsets (id)
-            """)
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS senses (
-                id TEXT PRIMARY KEY,
-                synset_id TEXT,
-                entry_id TEXT,
-                idx INTEGER
-            )""")
-        self.conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_senses_id
-            ON senses (id)
-            """)
+        self.bulk_load = bulk_load
+        if bulk_load:
+            # Without a journal a failed load leaves a corrupt database, so
+            # this is only for databases that are built from scratch
+            self.conn.execute("PRAGMA journal_mode = OFF")
+            self.conn.execute("PRAGMA synchronous = OFF")
+            # The rowids that the parts refer to are assigned as they are
+            # written, so checking every reference would only slow it down
+            self.conn.execute("PRAGMA foreign_keys = OFF")
+            self.conn.execute(f"PRAGMA cache_size = -{BULK_LOAD_CACHE_SIZE}")
+            self.conn.executescript(SCHEMA)
+        else:
+            self.conn.executescript(SCHEMA + INDEXES)
         self.conn.commit()
 
+    def _commit(self):
+        """Commit, unless in a bulk load, which is one transaction"""
+        if not self.bulk_load:
+            self.conn.commit()
 
-    def entries(self):
+    def end_bulk_load(self):
+        """
+        Write what is buffered, commit the bulk load, create the remaining
+        indexes and go back to the default journal, synchronous and foreign
+        key modes. The objects read during the load are dropped, since
+        changes made to them then are not in the database
+        """
+        if not self.bulk_load:
+            return
+        self.flush()
+        self.entry_cache.clear()
+        self.sense_cache.clear()
+        self.synset_cache.clear()
+        self.conn.commit()
+        self.conn.executescript(INDEXES)
+        self.conn.execute("PRAGMA journal_mode = DELETE")
+        self.conn.execute("PRAGMA synchronous = FULL")
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.bulk_load = False
+
+    def flush(self):
+        """Write the entries and synsets that were added to the database"""
         self._flush_entries()
+        self._flush_synsets()
+
+    def _parts(self, arms):
+        """
+        Read the parts of entries, senses or synsets in a single query. Each
+        of `arms` is a (table, owner column, columns, rowids) where `rowids`
+        are those of the owners whose parts are read, or None to read the
+        whole table. Returns the rows as (arm, owner rowid, index, *columns),
+        ordered by arm, owner and index
+        """
+        arms = [(table, owner, columns,
+                 None if rowids is None else padded(rowids))
+                for table, owner, columns, rowids in arms]
+        params = []
+        for _, _, _, rowids in arms:
+            if rowids is not None:
+                params.extend(rowids)
+        return self.conn.execute(parts_sql(tuple(
+            (table, owner, columns, None if rowids is None else len(rowids))
+            for table, owner, columns, rowids in arms)), params)
+
+    def _add_sense_parts(self, senses, rows):
+        """Add the rows of the sense parts arms of `_parts` to the senses
+        by rowid"""
+        for arm, rowid, _, a, b, c in rows:
+            sense = senses[rowid]
+            if arm == 0:
+                sense.sense_relations.append(
+                    SenseRelation(a, sense_rel_types[b], c))
+            elif arm == 1:
+                if not sense.subcat:
+                    sense.subcat = []
+                sense.subcat.append(a)
+            else:
+                if sense.sent is None:
+                    sense.sent = []
+                sense.sent.append(a)
+
+    def _read_entries(self, where=None, params=()):
+        """The entries selected by a condition on the entries table (or all
+        of them), in the order of their IDs"""
+        entries = {}
+        senses = {}
+        for (rowid, id, lemma, pos, sense_rowid, sense_id, synset, n,
+             sense_key, adjposition) in self.conn.execute(f"""
+                SELECT entries.rowid, entries.id, lemma, pos, senses.rowid,
+                       senses.id, synset_id, n, sense_key, adjposition
+                FROM entries LEFT JOIN senses ON senses.entry = entries.rowid
+                WHERE {where or 1} ORDER BY entries.id, senses.idx""", params):
+            entry = entries.get(rowid)
+            if entry is None:
+                entry = entries[rowid] = LexicalEntry(id)
+                entry.set_lemma(Lemma(lemma, parts_of_speech[pos]))
+            if sense_id is not None:
+                sense = senses[sense_rowid] = new_sense(
+                    sense_id, synset, n, sense_key, adjposition)
+                entry.senses.append(sense)
+        if not entries:
+            return []
+        selected = list(entries) if where else None
+        selected_senses = list(senses) if where else None
+        rows = self._parts(
+            (("forms", "entry", ("written_form",), selected),
+             ("pronunciations", "entry", ("value", "variety"), selected),
+             ("sense_relations", "sense", ("target", "rel_type", "other_type"),
+              selected_senses),
+             ("sense_subcats", "sense", ("frame",), selected_senses),
+             ("sense_sents", "sense", ("text",), selected_senses)))
+        sense_rows = []
+        for row in rows:
+            arm, rowid, _, a, b, _ = row
+            if arm == 0:
+                entries[rowid].forms.append(Form(a))
+            elif arm == 1:
+                entries[rowid].pronunciation.append(Pronunciation(a, b))
+            else:
+                sense_rows.append((arm - 2,) + row[1:])
+        self._add_sense_parts(senses, sense_rows)
+        return list(entries.values())
+
+    def _read_senses(self, where, params=()):
+        """The senses selected by a condition on the senses table, in the
+        order of their entries"""
+        senses = {}
+        for rowid, id, synset, n, sense_key, adjposition in self.conn.execute(f"""
+                SELECT rowid, id, synset_id, n, sense_key, adjposition
+                FROM senses WHERE {where} ORDER BY entry, idx""", params):
+            senses[rowid] = new_sense(id, synset, n, sense_key, adjposition)
+        if senses:
+            selected = list(senses)
+            self._add_sense_parts(senses, self._parts(
+                (("sense_relations", "sense", ("target", "rel_type", "other_type"),
+                  selected),
+                 ("sense_subcats", "sense", ("frame",), selected),
+                 ("sense_sents", "sense", ("text",), selected))))
+        return list(senses.values())
+
+    def _read_synsets(self, where=None, params=()):
+        """The synsets selected by a condition on the synsets table (or all
+        of them), in the order of their IDs"""
+        synsets = {}
+        wikidata_lists = set()
+        for (rowid, id, ili, pos, lex_name, source, ili_definition,
+             wikidata_list) in self.conn.execute(f"""
+                SELECT rowid, id, ili, pos, lex_name, source, ili_definition,
+                       wikidata_list
+                FROM synsets WHERE {where or 1} ORDER BY id""", params):
+            synset = Synset(id, ili, parts_of_speech[pos], lex_name, source)
+            if ili_definition is not None:
+                synset.ili_definition = Definition(ili_definition)
+            if wikidata_list:
+                wikidata_lists.add(rowid)
+            synsets[rowid] = synset
+        if not synsets:
+            return []
+        selected = list(synsets) if where else None
+        rows = self._parts(
+            (("definitions", "synset", ("text",), selected),
+             ("examples", "synset", ("text", "source"), selected),
+             ("synset_relations", "synset", ("target", "rel_type"), selected),
+             ("synset_members", "synset", ("entry_id",), selected),
+             ("synset_wikidata", "synset", ("qid",), selected)))
+        for arm, rowid, _, a, b in rows:
+            synset = synsets[rowid]
+            if arm == 0:
+                synset.definitions.append(Definition(a))
+            elif arm == 1:
+                synset.examples.append(Example(a, b))
+            elif arm == 2:
+                synset.synset_relations.append(
+                    SynsetRelation(a, synset_rel_types[b]))
+            elif arm == 3:
+                synset.members.append(a)
+            elif rowid not in wikidata_lists:
+                synset.wikidata = a
+            elif synset.wikidata is None:
+                synset.wikidata = [a]
+            else:
+                synset.wikidata.append(a)
+        return list(synsets.values())
+
+    def _by_ids(self, ids, cache, read):
+        """
+        Look up objects by their IDs, first in `cache` and then with `read`,
+        which is given a list of the IDs that were not found and returns
+        their objects in any order. Returns the objects in the order of
+        `ids`, with None for an ID that does not exist
+        """
+        ids = list(ids)
+        objects = {}
+        missing = []
+        for id in dict.fromkeys(ids):
+            obj = cache.get(id)
+            if obj is None:
+                missing.append(id)
+            else:
+                objects[id] = obj
+        for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            for obj in read(missing[start:start + LOOKUP_CHUNK_SIZE]):
+                objects[obj.id] = obj
+                cache.put(obj.id, obj)
+        return [objects.get(id) for id in ids]
+
+    def _stream(self, sql, read):
+        """
+        Run `sql`, which selects rowids, and yield the objects read by
+        `read` from each batch of `arraysize` of the rowids in turn
+        """
         cursor = self.conn.cursor()
-        cursor.execute("SELECT value FROM entries ORDER BY id")
-        for row in cursor.fetchall():
-            yield pickle.loads(row[0])
+        cursor.arraysize = self.arraysize
+        cursor.execute(sql)
+        while True:
+            rowids = [row[0] for row in cursor.fetchmany()]
+            if not rowids:
+                break
+            yield from read(rowids)
         cursor.close()
 
+    def _next_rowid(self, cursor, table):
+        cursor.execute(f"SELECT COALESCE(MAX(rowid), 0) + 1 FROM {table}")
+        return cursor.fetchone()[0]
+
+    def entries(self):
+        self._flush_entries()
+        yield from self._stream(
+            "SELECT rowid FROM entries ORDER BY id",
+            lambda rowids: self._read_entries(
+                *in_sql("entries.rowid", rowids)))
+
     def entries_len(self):
         self._flush_entries()
         cursor = self.conn.cursor()
@@ -96,33 +532,36 @@ class SQLLexicon:
     def pseudo_entries(self, prefix):
         self._flush_synsets()
         cursor = self.conn.cursor()
+        # The synsets are in order of their IDs, so that the numbering of the
+        # senses does not depend on the order in which they were added
         cursor.execute("""
             SELECT member, pos, GROUP_CONCAT(synset_id)
-            FROM members WHERE entry_id IS NULL 
+            FROM (SELECT member, pos, synset_id FROM members
+                  WHERE entry_id IS NULL ORDER BY member, pos, synset_id)
             GROUP BY member, pos
             """)
+        cursor.arraysize = self.arraysize
         # Get all synset_id with the same members and convert them to
         # LexicalEntry objects
-        for row in cursor.fetchall():
-            lemma = row[0]
-            pos = row[1]
-            synset_ids = row[2].split(",")
-            entry = LexicalEntry(f"{prefix}-{escape_lemma(lemma)}-{pos}")
-            entry.set_lemma(Lemma(lemma, PartOfSpeech(pos)))
-            for idx, synset_id in enumerate(synset_ids):
-                sense = Sense(f"{escape_lemma(lemma)}%pseudo:{pos}:{idx+1}",
-                              f"{prefix}-{synset_id}", None, -1)
-                entry.add_sense(sense)
-            yield entry
+        rows = cursor.fetchmany()
+        while rows:
+            for lemma, pos, synset_ids in rows:
+                entry = LexicalEntry(f"{prefix}-{escape_lemma(lemma)}-{pos}")
+                entry.set_lemma(Lemma(lemma, PartOfSpeech(pos)))
+                for idx, synset_id in enumerate(synset_ids.split(",")):
+                    sense = Sense(f"{escape_lemma(lemma)}%pseudo:{pos}:{idx+1}",
+                                  f"{prefix}-{synset_id}", None, -1)
+                    entry.add_sense(sense)
+                yield entry
+            rows = cursor.fetchmany()
         cursor.close()
 
     def synsets(self):
         self._flush_synsets()
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT value FROM synsets ORDER BY id")
-        for row in cursor.fetchall():
-            yield pickle.loads(row[0])
-        cursor.close()
+        yield from self._stream(
+            "SELECT rowid FROM synsets ORDER BY id",
+            lambda rowids: self._read_synsets(
+                *in_sql("rowid", rowids)))
 
     def synsets_len(self):
         self._flush_synsets()
@@ -130,58 +569,169 @@ class SQLLexicon:
         cursor.execute("SELECT COUNT(*) FROM synsets")
         count = cursor.fetchone()[0]
         cursor.close()
-        returncount
+        return count
+
+    def cache_info(self):
+        """The (hits, misses, maxsize, currsize) of the object caches of the
+        entries, senses and synsets, by name"""
+        return {"entries": self.entry_cache.info(),
+                "senses": self.sense_cache.info(),
+                "synsets": self.synset_cache.info()}
 
     def __str__(self):
         return "Lexicon with ID %s and %d entries and %d synsets" % (
-            self.id, entries_len(), synsets_len())
+            self.id, self.entries_len(), self.synsets_len())
 
     def _flush_entries(self):
         if len(self._dirty_entries) == 0:
             return
         cursor = self.conn.cursor()
-        entries = [(entry.id, pickle.dumps(entry)) for entry in self._dirty_entries]
-        cursor.executemany("""
-            INSERT INTO entries (id, value)
-            VALUES (?, ?)
-        """, entries)
+        rowid = self._next_rowid(cursor, "entries")
+        sense_rowid = self._next_rowid(cursor, "senses")
+        entries = []
+        forms = []
+        pronunciations = []
         senses = []
+        sense_relations = []
+        subcats = []
+        sents = []
         members = []
-
         for entry in self._dirty_entries:
+            entries.append((rowid, entry.id, entry.lemma.written_form,
+                            entry.lemma.part_of_speech.value))
+            forms.extend((rowid, index, form.written_form)
+                         for index, form in enumerate(entry.forms))
+            pronunciations.extend((rowid, index, pron.value, pron.variety)
+                                  for index, pron in enumerate(entry.pronunciation))
             for (index, sense) in enumerate(entry.senses):
-                senses.append((sense.id, sense.synset, entry.id, index))
+                senses.append((sense_rowid, sense.id, rowid, index, sense.synset,
+                               sense.n, sense.sense_key, sense.adjposition))
+                sense_relations.extend(
+                    (sense_rowid, i, rel.target, rel.rel_type.value,
+                     rel.other_type)
+                    for i, rel in enumerate(sense.sense_relations))
+                subcats.extend((sense_rowid, i, frame)
+                               for i, frame in enumerate(sense.subcat or ()))
+                sents.extend((sense_rowid, i, text)
+                             for i, text in enumerate(sense.sent or ()))
                 members.append((entry.lemma.written_form, entry.id, sense.synset, entry.lemma.part_of_speech.value))
+                sense_rowid += 1
+            rowid += 1
         cursor.executemany("""
-            INSERT INTO senses (id, synset_id, entry_id, idx)
+            INSERT INTO entries (rowid, id, lemma, pos)
             VALUES (?, ?, ?, ?)
+        """, entries)
+        cursor.executemany("""
+            INSERT INTO forms (entry, idx, written_form)
+            VALUES (?, ?, ?)
+        """, forms)
+        cursor.executemany("""
+            INSERT INTO pronunciations (entry, idx, value, variety)
+            VALUES (?, ?, ?, ?)
+        """, pronunciations)
+        cursor.executemany("""
+            INSERT INTO senses (rowid, id, entry, idx, synset_id, n, sense_key,
+                                adjposition)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, senses)
+        cursor.executemany("""
+            INSERT INTO sense_relations (sense, idx, target, rel_type, other_type)
+            VALUES (?, ?, ?, ?, ?)
+        """, sense_relations)
+        cursor.executemany("""
+            INSERT INTO sense_subcats (sense, idx, frame)
+            VALUES (?, ?, ?)
+        """, subcats)
+        cursor.executemany("""
+            INSERT INTO sense_sents (sense, idx, text)
+            VALUES (?, ?, ?)
+        """, sents)
         cursor.executemany("""
             INSERT INTO members (member, entry_id, synset_id, pos)
             VALUES (?, ?, ?, ?)
         """, members)
-        self.conn.commit()
+        self._commit()
         self._dirty_entries = []
         cursor.close()
+        self.entry_cache.clear()
+        self.sense_cache.clear()
 
     def _flush_synsets(self):
         if len(self._dirty_synsets) == 0:
             return
         cursor = self.conn.cursor()
+        first_rowid = rowid = self._next_rowid(cursor, "synsets")
+        synsets = []
+        for synset in self._dirty_synsets:
+            synsets.append((rowid, synset.id, synset.ili,
+                            synset.part_of_speech.value, synset.lex_name,
+                            synset.source,
+                            synset.ili_definition.text
+                            if synset.ili_definition else None,
+                            isinstance(synset.wikidata, list)))
+            rowid += 1
         # TODO: Actually raise an error for duplicate synsets instead of ignoring
         cursor.executemany("""
-            INSERT OR IGNORE INTO synsets (id, value)
-            VALUES (?, ?)
-        """, [(synset.id, pickle.dumps(synset)) for synset in self._dirty_synsets])
-        self.conn.commit()
+            INSERT OR IGNORE INTO synsets (rowid, id, ili, pos, lex_name,
+                                           source, ili_definition,
+                                           wikidata_list)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, synsets)
+        cursor.execute("SELECT rowid FROM synsets WHERE rowid >= ?",
+                       (first_rowid,))
+        inserted = set(row[0] for row in cursor.fetchall())
+        definitions = []
+        examples = []
+        synset_relations = []
+        synset_members = []
+        wikidata = []
+        for rowid, synset in enumerate(self._dirty_synsets, first_rowid):
+            if rowid not in inserted:
+                continue
+            definitions.extend((rowid, index, defn.text)
+                               for index, defn in enumerate(synset.definitions))
+            examples.extend((rowid, index, example.text, example.source)
+                            for index, example in enumerate(synset.examples))
+            synset_relations.extend(
+                (rowid, index, rel.target, rel.rel_type.value)
+                for index, rel in enumerate(synset.synset_relations))
+            synset_members.extend((rowid, index, member)
+                                  for index, member in enumerate(synset.members))
+            if synset.wikidata:
+                wikidata.extend(
+                    (rowid, index, qid) for index, qid in enumerate(
+                        synset.wikidata if isinstance(synset.wikidata, list)
+                        else [synset.wikidata]))
+        cursor.executemany("""
+            INSERT INTO definitions (synset, idx, text)
+            VALUES (?, ?, ?)
+        """, definitions)
+        cursor.executemany("""
+            INSERT INTO examples (synset, idx, text, source)
+            VALUES (?, ?, ?, ?)
+        """, examples)
+        cursor.executemany("""
+            INSERT INTO synset_relations (synset, idx, target, rel_type)
+            VALUES (?, ?, ?, ?)
+        """, synset_relations)
+        cursor.executemany("""
+            INSERT INTO synset_members (synset, idx, entry_id)
+            VALUES (?, ?, ?)
+        """, synset_members)
+        cursor.executemany("""
+            INSERT INTO synset_wikidata (synset, idx, qid)
+            VALUES (?, ?, ?)
+        """, wikidata)
+        self._commit()
         self._dirty_synsets = []
         cursor.executemany("""
             INSERT OR IGNORE INTO members (member, synset_id, pos)
             VALUES (?, ?, ?)
         """, self._dirty_pseudo_entries)
-        self.conn.commit()
+        self._commit()
         self._dirty_pseudo_entries = []
         cursor.close()
+        self.synset_cache.clear()
 
     def add_entry(self, entry):
         """Add an entry and all its senses"""
@@ -191,22 +741,36 @@ class SQLLexicon:
 
     def del_entry(self, entry):
         """Delete an entry and clear all senses"""
+        self.del_entries([entry.id])
+
+    def del_entries(self, ids):
+        """Delete several entries by their IDs and clear all their senses"""
         self._flush_entries()
-        conn = self.conn
-        cursor = conn.cursor()
-        cursor.execute("""
-            DELETE FROM entries
-            WHERE id = ?
-        """, (entry.id,))
-        cursor.execute("""
-            DELETE FROM senses
-            WHERE entry_id = ?
-        """, (entry.id,))
-        cursor.execute("""
-            DELETE FROM members
-            WHERE entry_id = ?
-        """, (entry.id,))
-        conn.commit()
+        ids = list(ids)
+        cursor = self.conn.cursor()
+        for start in range(0, len(ids), LOOKUP_CHUNK_SIZE):
+            chunk = ids[start:start + LOOKUP_CHUNK_SIZE]
+            for id in chunk:
+                self.entry_cache.discard(id)
+            condition, params = in_sql("entries.id", chunk)
+            cursor.execute(f"""
+                SELECT senses.id FROM entries JOIN senses ON senses.entry = entries.rowid
+                WHERE {condition}
+            """, params)
+            for (sense_id,) in cursor.fetchall():
+                self.sense_cache.discard(sense_id)
+            # The senses and other parts of the entries are deleted with them
+            condition, params = in_sql("id", chunk)
+            cursor.execute(f"""
+                DELETE FROM entries
+                WHERE {condition}
+            """, params)
+            condition, params = in_sql("entry_id", chunk)
+            cursor.execute(f"""
+                DELETE FROM members
+                WHERE {condition}
+            """, params)
+        self._commit()
         cursor.close()
 
     def del_sense(self, entry, sense):
@@ -214,6 +778,8 @@ class SQLLexicon:
         self._flush_entries()
         conn = self.conn
         cursor = conn.cursor()
+        self.entry_cache.discard(entry.id)
+        self.sense_cache.discard(sense.id)
         cursor.execute("""
             DELETE FROM senses
             WHERE id = ?
@@ -223,11 +789,7 @@ class SQLLexicon:
             WHERE entry_id = ? AND synset_id = ?
         """, (entry.id, sense.synset))
         entry.senses = [s for s in entry.senses if s.id != sense.id]
-        cursor.execute("""
-            REPLACE INTO entries (id, value)
-            VALUES (?, ?)
-        """, (entry.id, pickle.dumps(entry)))
-        conn.commit()
+        self._commit()
         cursor.close()
 
     def add_synset(self, synset):
@@ -236,15 +798,113 @@ class SQLLexicon:
             self._flush_synsets()
         self._dirty_synsets.append(synset)
 
-    def entry_by_id(self, id : str) -> LexicalEntry:
-        """Get an entry by its ID"""
-        self._flush_entries()
+    def del_synset(self, synset):
+        """Delete a synset, the senses referring to it are not changed"""
+        self.del_synsets([synset.id])
+
+    def del_synsets(self, ids):
+        """Delete several synsets by their IDs"""
+        self._flush_synsets()
+        ids = list(ids)
         cursor = self.conn.cursor()
-        cursor.execute("SELECT value FROM entries WHERE id = ?", (id,))
-        row = cursor.fetchone()
+        for start in range(0, len(ids), LOOKUP_CHUNK_SIZE):
+            chunk = ids[start:start + LOOKUP_CHUNK_SIZE]
+            for id in chunk:
+                self.synset_cache.discard(id)
+            # The parts of the synsets are deleted with them, and the members
+            # without an entry only exist because of them
+            condition, params = in_sql("id", chunk)
+            cursor.execute(f"""
+                DELETE FROM synsets
+                WHERE {condition}
+            """, params)
+            condition, params = in_sql("synset_id", chunk)
+            cursor.execute(f"""
+                DELETE FROM members
+                WHERE {condition} AND entry_id IS NULL
+            """, params)
+        self._commit()
+        cursor.close()
+
+    def sources(self):
+        """The (mtime_ns, size, digest) of each source file when it was last
+        loaded, by file"""
+        return {file: (mtime_ns, size, digest)
+                for file, mtime_ns, size, digest in self.conn.execute(
+                    "SELECT file, mtime_ns, size, digest FROM sources")}
+
+    def set_source(self, file, mtime_ns, size, digest, ids=None):
+        """Record the state of a source file when it was loaded and, if
+        `ids` is given, the IDs of the entries or synsets it defines"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT INTO sources (file, mtime_ns, size, digest)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (file) DO UPDATE SET
+                mtime_ns = excluded.mtime_ns, size = excluded.size,
+                digest = excluded.digest
+        """, (file, mtime_ns, size, digest))
+        if ids is not None:
+            cursor.execute("DELETE FROM source_ids WHERE file = ?", (file,))
+            cursor.executemany("""
+                INSERT INTO source_ids (file, idx, id)
+                VALUES (?, ?, ?)
+            """, ((file, index, id) for index, id in enumerate(ids)))
+        self._commit()
         cursor.close()
+
+    def del_source(self, file):
+        """Forget a source file and the IDs it defined"""
+        self.conn.execute("DELETE FROM sources WHERE file = ?", (file,))
+        self._commit()
+
+    def source_ids(self, file):
+        """The IDs of the entries or synsets defined in a source file"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT id FROM source_ids WHERE file = ? ORDER BY idx", (file,))]
+
+    def source_files(self, ids):
+        """The source files that define any of the entries or synsets with
+        `ids`"""
+        ids = list(ids)
+        files = set()
+        for start in range(0, len(ids), LOOKUP_CHUNK_SIZE):
+            condition, params = in_sql(
+                "id", ids[start:start + LOOKUP_CHUNK_SIZE])
+            files.update(row[0] for row in self.conn.execute(
+                f"SELECT DISTINCT file FROM source_ids WHERE {condition}",
+                params))
+        return files
+
+    def get_property(self, name):
+        """A property of the database, or None if it is not set"""
+        row = self.conn.execute(
+            "SELECT value FROM properties WHERE name = ?", (name,)).fetchone()
         if row:
-            return pickle.loads(row[0])
+            return row[0]
+
+    def set_property(self, name, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO properties (name, value) VALUES (?, ?)",
+            (name, value))
+        self._commit()
+
+    def entry_by_id(self, id : str) -> LexicalEntry:
+        """Get an entry by its ID"""
+        self._flush_entries()
+        entry = self.entry_cache.get(id)
+        if entry is None:
+            entries = self._read_entries("entries.id = ?", (id,))
+            if entries:
+                entry = entries[0]
+                self.entry_cache.put(id, entry)
+        return entry
+
+    def entries_by_ids(self, ids):
+        """The entries with each of `ids`, or None where there is none"""
+        self._flush_entries()
+        return self._by_ids(ids, self.entry_cache, lambda chunk:
+                            self._read_entries(*in_sql("entries.id", chunk)))
 
     def entry_id_by_lemma_synset_id(self, lemma, synset_id, prefix):
         """Get an entry ID by its lemma and synset ID"""
@@ -267,27 +927,36 @@ class SQLLexicon:
     def synset_by_id(self, id):
         """Get a synset by its ID"""
         self._flush_synsets()
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT value FROM synsets WHERE id = ?", (id,))
-        row = cursor.fetchone()
-        cursor.close()
-        if row:
-            return pickle.loads(row[0])
+        synset = self.synset_cache.get(id)
+        if synset is None:
+            synsets = self._read_synsets("id = ?", (id,))
+            if synsets:
+                synset = synsets[0]
+                self.synset_cache.put(id, synset)
+        return synset
+
+    def synsets_by_ids(self, ids):
+        """The synsets with each of `ids`, or None where there is none"""
+        self._flush_synsets()
+        return self._by_ids(ids, self.synset_cache, lambda chunk:
+                            self._read_synsets(*in_sql("id", chunk)))
 
     def sense_by_id(self, id):
         """Get a sense by its ID"""
         self._flush_entries()
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT idx, value FROM senses 
-            JOIN entries ON senses.entry_id = entries.id
-            WHERE senses.id = ?""", (id,))
-        row = cursor.fetchone()
-        cursor.close()
-        if row:
-            entry = pickle.loads(row[1])
-            index = row[0]
-            return entry.senses[index]
+        sense = self.sense_cache.get(id)
+        if sense is None:
+            senses = self._read_senses("id = ?", (id,))
+            if senses:
+                sense = senses[0]
+                self.sense_cache.put(id, sense)
+        return sense
+
+    def senses_by_ids(self, ids):
+        """The senses with each of `ids`, or None where there is none"""
+        self._flush_entries()
+        return self._by_ids(ids, self.sense_cache, lambda chunk:
+                            self._read_senses(*in_sql("id", chunk)))
 
     def entry_by_lemma(self, lemma):
         """Get all entry IDs with a given lemma"""
@@ -301,6 +970,25 @@ class SQLLexicon:
             entries.append(row[0])
         return entries
 
+    def entries_by_lemmas(self, lemmas):
+        """The entry IDs with each of `lemmas`"""
+        self._flush_entries()
+        entries = {}
+        lemmas = list(lemmas)
+        unique = list(dict.fromkeys(lemmas))
+        cursor = self.conn.cursor()
+        for start in range(0, len(unique), LOOKUP_CHUNK_SIZE):
+            condition, params = in_sql(
+                "member", unique[start:start + LOOKUP_CHUNK_SIZE])
+            cursor.execute(f"""
+                SELECT member, entry_id FROM members
+                WHERE {condition} ORDER BY member, rowid
+            """, params)
+            for member, entry_id in cursor.fetchall():
+                entries.setdefault(member, []).append(entry_id)
+        cursor.close()
+        return [entries.get(lemma, []) for lemma in lemmas]
+
     def members_by_id(self, synset_id):
         """Get all members of a synset by its ID"""
         self._flush_entries()
@@ -323,45 +1011,12 @@ class SQLLexicon:
     def change_sense_id(self, sense, new_id):
         raise NotImplementedError("Changing sense IDs is not supported in the database-backed Lexicon")
 
-    def to_xml(self, xml_file, part=False):
-        xml_file.write("""<?xml version="1.0" encoding="UTF-8"?>\n""")
-        if part:
-            xml_file.write(
-                """<!DOCTYPE LexicalResource SYSTEM "http://globalwordnet.github.io/schemas/WN-LMF-relaxed-1.3.dtd">\n""")
-        else:
-            xml_file.write(
-                """<!DOCTYPE LexicalResource SYSTEM "http://globalwordnet.github.io/schemas/WN-LMF-1.3.dtd">\n""")
-        if self.citation:
-            citation_text = f"""
-           citation="{self.citation}" """
-        else:
-            citation_text = ""
-        xml_file.write(
-            """<LexicalResource xmlns:dc="https://globalwordnet.github.io/schemas/dc/">
-  <Lexicon id="%s"
-           label="%s"
-           language="%s"
-           email="%s"
-           license="%s"
-           version="%s"%s
-           url="%s">
-""" %
-            (self.id,
-             self.label,
-             self.language,
-             self.email,
-             self.license,
-             self.version,
-             citation_text,
-             self.url))
-
-        for entry in self.entries():
-            entry.to_xml(xml_file, self.comments)
-        for entry in self.pseudo_entries(self.id):
-            entry.to_xml(xml_file, self.comments)
-        for synset in self.synsets():
-            synset.to_xml(xml_file, self.comments)
-        for synbeh in self.frames:
-            synbeh.to_xml(xml_file)
-        xml_file.write("""  </Lexicon>
-</LexicalResource>\n""")
+    def xml_contents(self):
+        """The entries (followed by the pseudo entries) and the synsets in
+        the order they are written to the XML"""
+        return (chain(self.entries(), self.pseudo_entries(self.id)),
+                self.synsets())
+
+    def to_xml(self, xml_file, part=False, buffer_size=DEFAULT_BUFFER_SIZE):
+        entries, synsets = self.xml_contents()
+        write_xml(xml_file.write, self, entries, synsets, part, buffer_size)
@@ -0,0 +1,328 @@
+"""Serializes a lexicon as GWA standard (WN-LMF) XML.
+
+The XML is built as a list of string pieces which is joined and written
+out in large chunks, instead of writing every element to the file
+separately."""
+import gzip
+import io
+import multiprocessing
+import os
+from collections import deque
+from itertools import chain, islice
+
+# Number of characters collected before a chunk is written out
+DEFAULT_BUFFER_SIZE = 0x100000
+# The pieces are mostly single lines, so the size of a chunk is estimated
+# from the number of pieces, which is much cheaper than adding up lengths
+PIECE_SIZE = 64
+# Number of entries or synsets serialized together by a worker process
+DEFAULT_SHARD_SIZE = 5000
+
+
+def escape_xml_lit(lit):
+    return (lit.replace("&", "&amp;").replace("'", "&apos;").
+            replace("\"", "&quot;").replace("<", "&lt;").replace(">", "&gt;"))
+
+
+def lexicon_header_xml(lexicon, part=False):
+    """The XML declaration and the start of the Lexicon element"""
+    if part:
+        doctype = "http://globalwordnet.github.io/schemas/WN-LMF-relaxed-1.3.dtd"
+    else:
+        doctype = "http://globalwordnet.github.io/schemas/WN-LMF-1.3.dtd"
+    if lexicon.citation:
+        citation_text = f"""
+           citation="{lexicon.citation}" """
+    else:
+        citation_text = ""
+    return """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE LexicalResource SYSTEM "%s">
+<LexicalResource xmlns:dc="https://globalwordnet.github.io/schemas/dc/">
+  <Lexicon id="%s"
+           label="%s"
+           language="%s"
+           email="%s"
+           license="%s"
+           version="%s"%s
+           url="%s">
+""" % (doctype,
+       lexicon.id,
+       lexicon.label,
+       lexicon.language,
+       lexicon.email,
+       lexicon.license,
+       lexicon.version,
+       citation_text,
+       lexicon.url)
+
+
+LEXICON_FOOTER_XML = """  </Lexicon>
+</LexicalResource>\n"""
+
+
+def entry_xml(entry, comments, out):
+    """Append the XML of a LexicalEntry to `out`"""
+    lemma = entry.lemma
+    pos = lemma.part_of_speech.value
+    if entry.pronunciation:
+        out.append("""    <LexicalEntry id="%s">
+      <Lemma writtenForm="%s" partOfSpeech="%s">
+""" % (entry.id, escape_xml_lit(lemma.written_form), pos if pos != "s" else "a"))
+        for pron in entry.pronunciation:
+            pronunciation_xml(pron, out)
+        out.append("      </Lemma>\n")
+    else:
+        out.append("""    <LexicalEntry id="%s">
+      <Lemma writtenForm="%s" partOfSpeech="%s"/>
+""" % (entry.id, escape_xml_lit(lemma.written_form), pos))
+    for form in entry.forms:
+        form_xml(form, out)
+    for sense in entry.senses:
+        sense_xml(sense, comments, out)
+    out.append("    </LexicalEntry>\n")
+
+
+def form_xml(form, out):
+    """Append the XML of a Form to `out`"""
+    out.append("""      <Form writtenForm="%s"/>
+""" % escape_xml_lit(form.written_form))
+
+
+def pronunciation_xml(pron, out):
+    """Append the XML of a Pronunciation to `out`"""
+    if pron.variety:
+        out.append("""        <Pronunciation variety="%s">%s</Pronunciation>
+""" % (pron.variety, escape_xml_lit(pron.value)))
+    else:
+        out.append("""        <Pronunciation>%s</Pronunciation>
+""" % escape_xml_lit(pron.value))
+
+
+def sense_xml(sense, comments, out):
+    """Append the XML of a Sense and its relations to `out`"""
+    attrs = ""
+    if sense.adjposition:
+        attrs = " adjposition=\"%s\"" % sense.adjposition
+    if sense.subcat:
+        attrs += " subcat=\"%s\"" % " ".join(sense.subcat)
+    attrs += " synset=\"%s\"" % sense.synset
+    if sense.sense_key:
+        attrs += " dc:identifier=\"%s\"" % escape_xml_lit(sense.sense_key)
+    if sense.sense_relations:
+        out.append("""      <Sense id="%s"%s>
+""" % (sense.id, attrs))
+        for rel in sense.sense_relations:
+            sense_relation_xml(rel, comments, out)
+        out.append("        </Sense>\n")
+    else:
+        out.append("""      <Sense id="%s"%s/>
+""" % (sense.id, attrs))
+
+
+def sense_relation_xml(rel, comments, out):
+    """Append the XML of a SenseRelation to `out`"""
+    if rel.other_type:
+        xml = """        <SenseRelation relType="other" target="%s" dc:type="%s"/>""" % (
+            rel.target, rel.other_type)
+    else:
+        xml = """        <SenseRelation relType="%s" target="%s"/>""" % (
+            rel.rel_type.value, rel.target)
+    if rel.target in comments:
+        out.append("%s <!-- %s -->\n" % (xml, comments[rel.target]))
+    else:
+        out.append(xml + "\n")
+
+
+def synset_xml(synset, comments, out):
+    """Append the XML of a Synset to `out`"""
+    if synset.id in comments:
+        out.append("""    <!-- %s -->
+""" % comments[synset.id])
+    source_tag = ""
+    if synset.source:
+        source_tag = " dc:source=\"%s\"" % (synset.source)
+    out.append(
+        """    <Synset id="%s" ili="%s" members="%s" partOfSpeech="%s" lexfile="%s"%s>
+""" %
+        (synset.id,
+         synset.ili,
+         " ".join(synset.members),
+         synset.part_of_speech.value,
+         synset.lex_name,
+         source_tag))
+    for defn in synset.definitions:
+        definition_xml(defn, out)
+    if synset.ili_definition:
+        definition_xml(synset.ili_definition, out, True)
+    for rel in synset.synset_relations:
+        synset_relation_xml(rel, comments, out)
+    for ex in synset.examples:
+        example_xml(ex, out)
+    out.append("    </Synset>\n")
+
+
+def definition_xml(defn, out, is_ili=False):
+    """Append the XML of a Definition (or ILIDefinition) to `out`"""
+    if is_ili:
+        out.append("""      <ILIDefinition>%s</ILIDefinition>
+""" % escape_xml_lit(defn.text))
+    else:
+        out.append("""      <Definition>%s</Definition>
+""" % escape_xml_lit(defn.text))
+
+
+def example_xml(example, out):
+    """Append the XML of an Example to `out`"""
+    if example.source:
+        out.append("""      <Example dc:source=\"%s\">%s</Example>
+""" % (escape_xml_lit(example.source), escape_xml_lit(example.text)))
+    else:
+        out.append("""      <Example>%s</Example>
+""" % escape_xml_lit(example.text))
+
+
+def synset_relation_xml(rel, comments, out):
+    """Append the XML of a SynsetRelation to `out`"""
+    if rel.target in comments:
+        out.append("""      <SynsetRelation relType="%s" target="%s"/> <!-- %s -->
+""" % (rel.rel_type.value, rel.target, comments[rel.target]))
+    else:
+        out.append("""      <SynsetRelation relType="%s" target="%s"/>
+""" % (rel.rel_type.value, rel.target))
+
+
+def syntactic_behaviour_xml(synbeh, out):
+    """Append the XML of a SyntacticBehaviour to `out`"""
+    out.append("""  <SyntacticBehaviour id="%s" subcategorizationFrame="%s"/>
+""" % (synbeh.id, escape_xml_lit(synbeh.subcategorization_frame)))
+
+
+def write_xml(write, lexicon, entries, synsets, part=False,
+              buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Serialize the lexicon with the given (already ordered) entries and
+    synsets, passing the XML to `write` in chunks of about `buffer_size`
+    characters
+    """
+    comments = lexicon.comments
+    chunk_pieces = max(1, buffer_size // PIECE_SIZE)
+    out = [lexicon_header_xml(lexicon, part)]
+    for entry in entries:
+        entry_xml(entry, comments, out)
+        if len(out) >= chunk_pieces:
+            write("".join(out))
+            out.clear()
+    for synset in synsets:
+        synset_xml(synset, comments, out)
+        if len(out) >= chunk_pieces:
+            write("".join(out))
+            out.clear()
+    for synbeh in lexicon.frames:
+        syntactic_behaviour_xml(synbeh, out)
+    out.append(LEXICON_FOOTER_XML)
+    write("".join(out))
+
+
+def write_lexicon(lexicon, output, compress=False,
+                  buffer_size=DEFAULT_BUFFER_SIZE, part=False, jobs=1,
+                  shard_size=DEFAULT_SHARD_SIZE):
+    """
+    Write the lexicon as XML to the file `output`, compressing it with gzip
+    if `compress` is set. If `jobs` is greater than one the entries and
+    synsets are serialized in shards of `shard_size` objects by a pool of
+    that many processes
+    """
+    if jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+        write_lexicon_sharded(lexicon, output, compress, part, jobs,
+                              shard_size)
+        return
+    if compress:
+        outp = gzip.open(output, "wb")
+    else:
+        outp = open(output, "wb", buffering=buffer_size)
+    with io.TextIOWrapper(outp, encoding="utf-8", newline="",
+                          write_through=True) as xml_file:
+        lexicon.to_xml(xml_file, part, buffer_size)
+
+
+# The comments of the lexicon being written by `write_lexicon_sharded`. The
+# worker processes are forked from the writing process, so they read them
+# from here rather than having them pickled with every shard
+_shard_comments = None
+
+
+def serialize_shard(shard):
+    """
+    Serialize a batch of the entries or synsets of the lexicon being written
+    to UTF-8, as a complete gzip member if `compresslevel` is not None
+    """
+    kind, objects, compresslevel = shard
+    to_xml = entry_xml if kind == "entries" else synset_xml
+    out = []
+    for obj in objects:
+        to_xml(obj, _shard_comments, out)
+    data = "".join(out).encode("utf-8")
+    if compresslevel is not None:
+        data = gzip.compress(data, compresslevel, mtime=0)
+    return data
+
+
+def batches(objects, size):
+    """Split an iterable into lists of `size` items, the last of which may
+    be shorter"""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_lexicon_sharded(lexicon, output, compress=False, part=False,
+                          jobs=None, shard_size=DEFAULT_SHARD_SIZE):
+    """
+    Write the lexicon as XML to the file `output`, serializing shards of
+    `shard_size` entries or synsets in parallel and writing them out in
+    order. The shards are read from the lexicon as they are needed, with at
+    most two for each process at a time, so a lexicon that streams its
+    objects from a database is never held in memory as a whole. When
+    compressing, each shard is compressed separately and the output is a
+    multi-member gzip file, which decompresses to the same XML as the
+    serial writer produces
+    """
+    global _shard_comments
+    if jobs is None:
+        jobs = os.cpu_count()
+    entries, synsets = lexicon.xml_contents()
+    compresslevel = 9 if compress else None
+    shards = chain(
+        (("entries", batch, compresslevel)
+         for batch in batches(entries, shard_size)),
+        (("synsets", batch, compresslevel)
+         for batch in batches(synsets, shard_size)))
+
+    def encode(xml):
+        data = xml.encode("utf-8")
+        if compress:
+            data = gzip.compress(data, compresslevel, mtime=0)
+        return data
+
+    footer = []
+    for synbeh in lexicon.frames:
+        syntactic_behaviour_xml(synbeh, footer)
+    footer.append(LEXICON_FOOTER_XML)
+    _shard_comments = lexicon.comments
+    try:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(jobs) as pool, open(output, "wb") as outp:
+            outp.write(encode(lexicon_header_xml(lexicon, part)))
+            pending = deque()
+            for shard in shards:
+                pending.append(pool.apply_async(serialize_shard, (shard,)))
+                if len(pending) >= 2 * jobs:
+                    outp.write(pending.popleft().get())
+            while pending:
+                outp.write(pending.popleft().get())
+            outp.write(encode("".join(footer)))
+    finally:
+        _shard_comments = None